@@ -0,0 +1,229 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from cache import DirectoryCache, CACHE_DIR
+import metrics
+
+# ----- 보고서 산출물 저장소 설정 (세션 상태에는 핸들만 보관) -----
+
+# 디스크 저장소 전체 크기 상한과 마지막 사용 후 보관 시간 (작업 보관 기간과 같은 24시간)
+ARTIFACT_STORE_MAX_BYTES = int(os.getenv("ARTIFACT_STORE_MB", "1024")) * 1024 * 1024
+ARTIFACT_STORE_TTL = int(os.getenv("ARTIFACT_STORE_TTL", "86400"))
+
+# 만료 항목을 지우는 디렉터리 스캔 간격 (총 크기 상한을 넘으면 간격과 관계없이 스캔)
+ARTIFACT_SWEEP_INTERVAL = 600
+
+# 메모리에 올려둘 산출물 바이트 상한 (프로세스 전체 / 세션당)
+ARTIFACT_MEMORY_MAX_BYTES = int(os.getenv("ARTIFACT_MEMORY_MB", "128")) * 1024 * 1024
+SESSION_MEMORY_MAX_BYTES = int(os.getenv("SESSION_MEMORY_MB", "8")) * 1024 * 1024
+
+HANDLE_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class ArtifactExpiredError(Exception):
+    """핸들이 가리키는 산출물이 저장소에서 만료/제거된 경우"""
+
+
+class ArtifactStore(DirectoryCache):
+    """내용 주소 기반 산출물 저장소 (핸들 = 내용 SHA-256, 마지막 사용 후 TTL 경과 또는 총 크기 초과 시 제거)"""
+
+    def __init__(self, path, max_bytes, ttl):
+        super().__init__(path, max_bytes)
+        self.ttl = ttl
+        self.evictions = 0
+        self._swept = 0.0
+
+    def _file(self, handle):
+        # 핸들은 작업 결과(DB)에서도 오므로 경로로 쓰기 전에 형식 확인
+        if not HANDLE_PATTERN.fullmatch(handle):
+            raise ValueError(f"잘못된 산출물 핸들: {handle}")
+        return os.path.join(self.path, handle)
+
+    def get(self, handle):
+        """핸들로 바이트 조회 (없거나 만료되었으면 None, 조회하면 보관 시간 연장)"""
+        path = self._file(handle)
+        try:
+            if os.path.getmtime(path) < time.time() - self.ttl:
+                if self._discard(path):
+                    self.evictions += 1
+                self.misses += 1
+                return None
+        except OSError:
+            self.misses += 1
+            return None
+        return super().get(handle)
+
+    def put(self, data):
+        """바이트 저장 후 핸들 반환 (같은 내용은 한 번만 저장)"""
+        handle = hashlib.sha256(data).hexdigest()
+        try:
+            os.utime(self._file(handle))
+        except OSError:
+            super().put(handle, data)
+        return handle
+
+    def _needs_evict(self):
+        return super()._needs_evict() or time.time() - self._swept > ARTIFACT_SWEEP_INTERVAL
+
+    def _evict(self):
+        # 만료된 항목을 먼저 지우고, 남은 총 크기가 상한을 넘으면 오래 사용하지 않은 항목부터 제거
+        self._swept = time.time()
+        expires = self._swept - self.ttl
+        entries = self._scan()
+        total = sum(size for _mtime, size, _path in entries)
+
+        for mtime, size, path in sorted(entries):
+            if mtime >= expires and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self.evictions += 1
+            except OSError:
+                pass
+        self._bytes = total
+
+    def stats(self):
+        return dict(super().stats(), ttl=self.ttl, evictions=self.evictions)
+
+
+class ArtifactMemory:
+    """세션별/전체 바이트 예산 안에서 산출물을 메모리에 보관하는 LRU (초과 시 오래 사용하지 않은 항목부터 제거)"""
+
+    def __init__(self, max_bytes, session_max_bytes):
+        self.max_bytes = max_bytes
+        self.session_max_bytes = session_max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._session_bytes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id, handle):
+        """세션이 보관 중인 바이트 (없으면 None)"""
+        with self._lock:
+            data = self._entries.get((session_id, handle))
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((session_id, handle))
+            self.hits += 1
+            return data
+
+    def put(self, session_id, handle, data):
+        """세션 항목으로 보관 후 세션/전체 예산 유지 (세션 예산보다 큰 항목은 보관하지 않음)"""
+        if not data or len(data) > self.session_max_bytes:
+            return
+        with self._lock:
+            key = (session_id, handle)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = data
+            self._bytes += len(data)
+            self._session_bytes[session_id] = self._session_bytes.get(session_id, 0) + len(data)
+
+            # 세션 예산 초과: 같은 세션의 오래된 항목부터, 전체 예산 초과: 모든 세션에서 오래된 항목부터
+            while self._session_bytes[session_id] > self.session_max_bytes:
+                self._remove(next(k for k in self._entries if k[0] == session_id))
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def release(self, session_id):
+        """세션이 보관 중인 항목 모두 제거 (새 보고서를 불러올 때)"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == session_id]:
+                self._remove(key, evicted=False)
+
+    def _remove(self, key, evicted=True):
+        data = self._entries.pop(key)
+        self._bytes -= len(data)
+        self._session_bytes[key[0]] -= len(data)
+        if not self._session_bytes[key[0]]:
+            del self._session_bytes[key[0]]
+        if evicted:
+            self.evictions += 1
+
+    def stats(self):
+        """보관 중인 바이트/항목/세션 수와 적중/제거 횟수"""
+        with self._lock:
+            return {
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "session_max_bytes": self.session_max_bytes,
+                "entries": len(self._entries),
+                "sessions": len(self._session_bytes),
+                "largest_session_bytes": max(self._session_bytes.values(), default=0),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+artifact_memory = ArtifactMemory(ARTIFACT_MEMORY_MAX_BYTES, SESSION_MEMORY_MAX_BYTES)
+
+_artifact_store = None
+_artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """프로세스 공용 산출물 저장소"""
+    global _artifact_store
+    with _artifact_store_lock:
+        if _artifact_store is None:
+            _artifact_store = ArtifactStore(os.path.join(CACHE_DIR, "artifacts"),
+                                            ARTIFACT_STORE_MAX_BYTES, ARTIFACT_STORE_TTL)
+        return _artifact_store
+
+
+def store_artifact(data):
+    """바이트(문자열은 UTF-8)를 저장소에 넣고 핸들 반환"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return get_artifact_store().put(data)
+
+
+def read_artifact(handle, session_id=None):
+    """핸들로 바이트 조회 (세션 메모리 예산 안에서 재사용, 저장소에서 만료되었으면 None)"""
+    # 세션 없이 읽는 경우(파일 생성, 배치)는 한 번 쓰고 버리므로 메모리에 보관하지 않음
+    if session_id is None:
+        return get_artifact_store().get(handle)
+
+    data = artifact_memory.get(session_id, handle)
+    if data is None:
+        data = get_artifact_store().get(handle)
+        if data is not None:
+            artifact_memory.put(session_id, handle, data)
+    return data
+
+
+def read_artifact_text(handle, session_id=None):
+    """핸들로 텍스트 조회 (만료되었으면 None)"""
+    data = read_artifact(handle, session_id)
+    return data.decode("utf-8") if data is not None else None
+
+
+def _memory_gauges():
+    stats = artifact_memory.stats()
+    return {
+        "bytes": stats["bytes"],
+        "entries": stats["entries"],
+        "sessions": stats["sessions"],
+        "largest_session_bytes": stats["largest_session_bytes"],
+        "evictions_total": stats["evictions"]
+    }
+
+
+def _store_gauges():
+    stats = get_artifact_store().stats()
+    return {"bytes": stats["bytes"], "max_bytes": stats["max_bytes"], "evictions_total": stats["evictions"]}
+
+
+# /metrics에 보관 중인 바이트와 제거 횟수 노출
+metrics.registry.gauge("artifact_memory", _memory_gauges)
+metrics.registry.gauge("artifact_store", _store_gauges)
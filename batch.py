@@ -0,0 +1,179 @@
+"""보고서 일괄 생성 (Streamlit 없이 실행)
+
+실행: python batch.py manifest.json --out-dir reports --workers 4 --formats docx pdf
+
+매니페스트 형식 (JSON 또는 JSONL):
+  {"defaults": {"report_length": 3}, "jobs": [{"name": "ai", "user_query": "생성형 AI 시장 동향"},
+                                              {"document_path": "docs/report.pdf", "include_images": false}]}
+  작업 항목 키는 pipeline.run_report_job 옵션과 같고, name/formats는 출력 파일 이름과 형식 지정용
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# 모듈 설정값이 import 시점에 환경 변수를 읽으므로 먼저 로드
+load_dotenv()
+
+from pipeline import Reporter, run_report_job
+from exports import ARTIFACT_BUILDERS
+from metrics import start_metrics_server
+
+DEFAULT_FORMATS = ["docx", "pdf"]
+
+
+class ConsoleReporter(Reporter):
+    """작업 이름을 붙여 메시지를 콘솔에 출력"""
+
+    _print_lock = threading.Lock()
+
+    def __init__(self, name, verbose=False):
+        super().__init__()
+        self.name = name
+        self.verbose = verbose
+
+    def message(self, level, text):
+        super().message(level, text)
+        if self.verbose or level in ("warning", "error"):
+            with self._print_lock:
+                print(f"[{self.name}] {level}: {text}", file=sys.stderr)
+
+
+def load_manifest(path):
+    """매니페스트를 작업 목록으로 변환 (기본값 병합, 문서 경로는 매니페스트 기준 상대 경로)"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            manifest = {"jobs": [json.loads(line) for line in f if line.strip()]}
+        else:
+            manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = manifest.get("defaults", {})
+    jobs = []
+    for index, item in enumerate(manifest.get("jobs", [])):
+        job = dict(defaults, **item)
+        if not job.get("user_query") and not job.get("document_path"):
+            raise ValueError(f"작업 {index + 1}: user_query 또는 document_path가 필요합니다.")
+        if job.get("document_path"):
+            job["document_path"] = os.path.join(base_dir, job["document_path"])
+        job.setdefault("name", f"report_{index + 1:03d}")
+        job["name"] = re.sub(r"[^\w.-]+", "_", job["name"])
+        job["stream"] = False
+        jobs.append(job)
+    return jobs
+
+
+def stage_seconds(spans):
+    """최상위 단계 span을 단계별 소요 시간으로 변환"""
+    durations = {}
+    for span in spans:
+        if span["parent"] is None:
+            durations[span["name"]] = round(durations.get(span["name"], 0.0) + span["wall_seconds"], 3)
+    return durations
+
+
+def run_job(job, out_dir, formats, verbose=False):
+    """작업 1건 실행 후 보고서 파일 저장, 타이밍 요약 반환"""
+    reporter = ConsoleReporter(job["name"], verbose)
+    started = time.perf_counter()
+    summary = {"name": job["name"], "status": "failed", "outputs": [], "error": None}
+
+    try:
+        result = run_report_job(job, reporter)
+        pipeline_done = time.perf_counter()
+        summary["pipeline_seconds"] = round(pipeline_done - started, 3)
+
+        if not result["report"]:
+            summary["error"] = "수집된 정보가 없어 보고서를 생성하지 못했습니다."
+            return summary
+
+        # 마크다운 원문과 요청한 형식의 파일 저장
+        markdown_path = os.path.join(out_dir, f"{job['name']}.md")
+        with open(markdown_path, "w", encoding="utf-8") as f:
+            f.write(result["report"])
+        summary["outputs"].append(markdown_path)
+
+        export_seconds = {}
+        for kind in job.get("formats", formats):
+            with reporter.stage(f"export_{kind}") as span:
+                data = ARTIFACT_BUILDERS[kind](result["report"], result["images"])
+                output_path = os.path.join(out_dir, f"{job['name']}.{kind}")
+                with open(output_path, "wb") as f:
+                    f.write(data)
+            export_seconds[kind] = span.wall_seconds
+            summary["outputs"].append(output_path)
+
+        summary["export_seconds"] = export_seconds
+        summary["status"] = "done" if not any(level == "error" for level, _ in reporter.messages) else "done_with_errors"
+    except Exception as e:
+        error_msg = f"[{job['name']}] 작업 실행 오류: {str(e)}"
+        print(error_msg, file=sys.stderr)
+        summary["error"] = str(e)
+    finally:
+        summary["seconds"] = round(time.perf_counter() - started, 3)
+        summary["stages"] = stage_seconds(reporter.trace.summary())
+        summary["spans"] = reporter.trace.summary()
+        summary["messages"] = reporter.messages
+
+    return summary
+
+
+def print_summary(summaries, wall_seconds):
+    """작업별 타이밍 표와 전체 통계 출력"""
+    print(f"{'작업':<24} {'상태':<16} {'전체(초)':>9} {'파이프라인':>10} {'파일 생성':>10}")
+    for summary in summaries:
+        export_total = sum(summary.get("export_seconds", {}).values())
+        print(f"{summary['name'][:24]:<24} {summary['status']:<16} {summary['seconds']:>9.2f} "
+              f"{summary.get('pipeline_seconds', 0.0):>10.2f} {export_total:>10.2f}")
+
+    seconds = sorted(summary["seconds"] for summary in summaries)
+    succeeded = sum(1 for summary in summaries if summary["status"].startswith("done"))
+    if seconds:
+        p95 = seconds[min(len(seconds) - 1, int(round(0.95 * (len(seconds) - 1))))]
+        print(f"\n완료 {succeeded}/{len(summaries)}건, 전체 {wall_seconds:.2f}초 "
+              f"(작업당 중앙값 {statistics.median(seconds):.2f}초, p95 {p95:.2f}초, 최대 {seconds[-1]:.2f}초)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="매니페스트의 질의/문서로 보고서를 일괄 생성")
+    parser.add_argument("manifest", help="작업 매니페스트 (.json 또는 .jsonl)")
+    parser.add_argument("--out-dir", default="reports", help="보고서 저장 디렉터리")
+    parser.add_argument("--workers", type=int, default=4, help="동시에 실행할 작업 수")
+    parser.add_argument("--formats", nargs="+", choices=sorted(ARTIFACT_BUILDERS), default=DEFAULT_FORMATS,
+                        help="생성할 파일 형식")
+    parser.add_argument("--summary", help="작업별 타이밍 요약 JSON 저장 경로 (기본: OUT_DIR/summary.json)")
+    parser.add_argument("--verbose", action="store_true", help="파이프라인 메시지를 모두 출력")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="실행 중 /metrics 엔드포인트 포트 (기본: METRICS_PORT)")
+    args = parser.parse_args(argv)
+
+    start_metrics_server(args.metrics_port)
+
+    jobs = load_manifest(args.manifest)
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        summaries = list(executor.map(lambda job: run_job(job, args.out_dir, args.formats, args.verbose), jobs))
+    wall_seconds = time.perf_counter() - started
+
+    print_summary(summaries, wall_seconds)
+
+    summary_path = args.summary or os.path.join(args.out_dir, "summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump({"wall_seconds": round(wall_seconds, 3), "workers": args.workers, "jobs": summaries},
+                  f, ensure_ascii=False, indent=2)
+
+    return 0 if all(summary["status"] == "done" for summary in summaries) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""앱 시작/재실행 시간 측정: 새 프로세스의 모듈 import 시간, 무거운 라이브러리 로드 여부, Streamlit 첫 실행/재실행 시간
+
+실행: python benchmarks/bench_app_startup.py [--repeat 5] [--reruns 10]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# app.py가 시작 시 가져오는 모듈
+APP_MODULES = ["context", "exports", "images", "ingest", "cache", "jobs", "pipeline", "corpus", "metrics"]
+
+# 보고서 단계에서만 필요한 무거운 라이브러리
+HEAVY_MODULES = ["openai", "httpx", "fitz", "docx", "PIL.Image", "requests"]
+
+IMPORT_PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import streamlit
+streamlit_seconds = time.perf_counter() - started
+started = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+print(json.dumps({{"streamlit": streamlit_seconds, "app_modules": time.perf_counter() - started,
+                  "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure_imports(repeat, env):
+    """새 프로세스마다 streamlit과 앱 모듈 import 시간 측정 (디스크 캐시 영향을 줄이려 중앙값 사용)"""
+    probe = IMPORT_PROBE.format(modules=APP_MODULES, heavy=HEAVY_MODULES)
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return {
+        "streamlit": statistics.median(run["streamlit"] for run in runs),
+        "app_modules": statistics.median(run["app_modules"] for run in runs),
+        "loaded": runs[-1]["loaded"]
+    }
+
+
+# AppTest 대기(폴링) 시간을 빼고 스크립트 실행 시간만 재도록 app.py를 감싸서 실행
+RERUN_WRAPPER = """
+import time, runpy
+import streamlit as st
+started = time.perf_counter()
+runpy.run_path({app_path!r}, run_name="__main__")
+st.session_state["_bench_seconds"] = time.perf_counter() - started
+"""
+
+
+def measure_reruns(reruns):
+    """AppTest로 app.py 첫 실행과 재실행(위젯 상호작용과 같은 전체 스크립트 재실행) 시간 측정"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_string(RERUN_WRAPPER.format(app_path=os.path.join(ROOT, "app.py")), default_timeout=30)
+    timings = []
+    for _ in range(reruns + 1):
+        app.run()
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+        timings.append(app.session_state["_bench_seconds"])
+    return {"first": timings[0], "rerun_p50": statistics.median(timings[1:]), "rerun_max": max(timings[1:])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="import 측정 프로세스 수")
+    parser.add_argument("--reruns", type=int, default=10, help="재실행 측정 횟수")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # 작업 큐/캐시 DB는 임시 디렉터리에 만들고 메트릭 로그는 끔
+        os.environ.update({"CACHE_DIR": temp_dir, "METRICS_LOG": "off"})
+        os.environ.pop("METRICS_PORT", None)
+        env = dict(os.environ, PYTHONPATH=ROOT)
+
+        imports = measure_imports(args.repeat, env)
+        sys.path.insert(0, ROOT)
+        reruns = measure_reruns(args.reruns)
+
+    print(f"streamlit import       {imports['streamlit'] * 1000:8.1f} ms")
+    print(f"앱 모듈 import         {imports['app_modules'] * 1000:8.1f} ms")
+    print(f"시작 시 로드된 라이브러리: {', '.join(imports['loaded']) or '없음'}")
+    print(f"첫 실행 (AppTest)      {reruns['first'] * 1000:8.1f} ms")
+    print(f"재실행 p50 / 최대      {reruns['rerun_p50'] * 1000:8.1f} / {reruns['rerun_max'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
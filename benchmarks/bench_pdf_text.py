@@ -0,0 +1,51 @@
+"""PDF 텍스트 추출 방식 비교: plain(페이지 전체 get_text)과 blocks(블록 + 머리글/바닥글 제거)의 시간/토큰/청크 수
+
+실행: python benchmarks/bench_pdf_text.py [--pages 20 200] [--repeat 3] [--pdf 실제문서.pdf ...]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_docs import make_pdf
+from extraction import iter_page_range, strip_boilerplate
+from context import count_tokens, split_chunks
+from ingest import open_pdf
+
+
+def extract_texts(path, text_mode):
+    with open_pdf(path) as doc:
+        page_count = doc.page_count
+    pages = list(iter_page_range(path, 0, page_count, text_mode))
+    removed = strip_boilerplate(pages)
+    return [page["text"] for page in pages if page["text"].strip()], removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 200])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pdf", nargs="*", default=[], help="합성 문서 대신(또는 함께) 측정할 PDF 파일")
+    args = parser.parse_args()
+
+    print(f"{'문서':<28} {'방식':<7} {'시간(초)':>9} {'토큰':>9} {'청크':>6} {'제거 블록':>9}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = [make_pdf(os.path.join(temp_dir, f"synthetic_{pages}p.pdf"), pages) for pages in args.pages]
+        for path in paths + args.pdf:
+            for text_mode in ("plain", "blocks"):
+                timings = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    texts, removed = extract_texts(path, text_mode)
+                    timings.append(time.perf_counter() - started)
+                tokens = sum(count_tokens(text) for text in texts)
+                print(f"{os.path.basename(path)[:28]:<28} {text_mode:<7} {statistics.median(timings):>9.3f} "
+                      f"{tokens:>9} {len(split_chunks(texts)):>6} {removed:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""파이프라인 벤치마크: 대역 서버(Firecrawl/OpenAI)와 합성 문서로 단계별 p50/p95 지연과 처리량 측정
+
+실행: python benchmarks/bench_pipeline.py [--repeat 5] [--latency 0.05] [--json result.json]
+회귀 확인: python benchmarks/bench_pipeline.py --baseline result.json --tolerance 0.25  (느려지면 종료 코드 1)
+측정 전에 보고서 항목 선택 재생성(초안 재사용/형식이 다른 초안 처리)을 확인하고 실패하면 중단
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from mock_servers import MockConfig, start_mock_server
+from synthetic_docs import make_corpus
+
+# 기준값보다 느려져도 이 차이(초)보다 작으면 측정 잡음으로 보고 무시
+NOISE_FLOOR_SECONDS = 0.005
+
+
+def configure_environment(base_url, cache_dir):
+    """대역 서버 주소와 격리된 캐시 디렉터리 지정 (캐시/요청 간격은 측정에서 제외)"""
+    os.environ.update({
+        "FIRECRAWL_BASE_URL": base_url,
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "FIRECRAWL_API_KEY": "fc-benchmark-key",
+        "OPENAI_API_KEY": "sk-benchmark-key",
+        "CACHE_DIR": cache_dir,
+        "FIRECRAWL_CACHE_TTL": "0",
+        "FIRECRAWL_MIN_INTERVAL": "0",
+        "LLM_CACHE_TTL": "0"
+    })
+    os.environ.setdefault("METRICS_LOG", "off")
+
+
+def percentile(values, ratio):
+    """정렬 기준 nearest-rank 백분위수"""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(ratio * (len(values) - 1))))]
+
+
+def measure(name, func, repeat, warmup, units=1, unit="회"):
+    """func를 warmup회 실행한 뒤 repeat회 측정해 지연 분포와 처리량 반환"""
+    for i in range(warmup):
+        func(-1 - i)
+    timings = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        func(i)
+        timings.append(time.perf_counter() - started)
+    p50 = statistics.median(timings)
+    return {
+        "name": name,
+        "runs": repeat,
+        "p50": round(p50, 4),
+        "p95": round(percentile(timings, 0.95), 4),
+        "throughput": round(units / p50, 2) if p50 else None,
+        "unit": unit
+    }
+
+
+def check_report_sections(config):
+    """항목 선택 재생성 확인: 빼기만 하면 LLM 호출 없이 초안 재사용, 형식이 다르거나 항목을 추가하면 다시 작성"""
+    from pipeline import Reporter, run_report_job
+
+    def run(query, **sections):
+        before = config.requests.get("/v1/chat/completions", 0)
+        params = {"user_query": query, "session_id": "section-check", **sections}
+        report = run_report_job(params, Reporter())["report"] or ""
+        return report, config.requests.get("/v1/chat/completions", 0) - before
+
+    def expect(condition, message):
+        if not condition:
+            raise RuntimeError(f"보고서 항목 확인 실패: {message}")
+
+    report, calls = run("항목 확인")
+    expect(calls == 1 and report.startswith("# ") and "참고 링크" in report, "전체 항목 초안")
+    report, calls = run("항목 확인", include_title=False, include_sources=False)
+    expect(calls == 0 and not report.startswith("# ") and "참고 링크" not in report and "## 주요 동향" in report,
+           "제목/참고 링크를 뺀 재생성이 초안을 재사용하지 않음")
+    # 대역 서버는 프롬프트와 관계없이 같은 보고서를 돌려주므로 호출 수만 확인
+    _report, calls = run("항목 확인 2", include_title=False)
+    expect(calls == 1, "제목 없이 작성한 초안")
+    report, calls = run("항목 확인 2")
+    expect(calls == 1, "초안에 없던 제목을 추가하면 다시 작성해야 함")
+
+    # 모델이 SECTION_FORMAT을 따르지 않으면 나누지 않고 다시 작성한 초안을 그대로 사용
+    config.report = "생성형 AI 시장이 성장하고 있다.\n\n투자와 도입 사례가 늘고 있다."
+    try:
+        run("항목 확인 3")
+        report, calls = run("항목 확인 3", include_lead=False)
+        expect(calls == 1 and report.startswith(config.report), "형식이 다른 초안에서 본문이 빠짐")
+    finally:
+        config.report = None
+
+
+def run_benchmarks(args, documents):
+    # 모듈 설정값이 import 시점에 환경 변수를 읽으므로 대역 서버 주소를 지정한 뒤 가져옴
+    import fitz  # PyMuPDF
+    from pipeline import Reporter, extract_from_pdf, extract_from_docx, run_report_job
+    from context import pack_context, count_tokens
+    from report import build_report_prompt
+    from exports import create_docx_report
+    from ingest import open_path
+    from bench_report_export import make_report, make_images
+
+    results = []
+
+    # 1. 문서 추출 (추출 캐시를 거치지 않는 함수 직접 호출)
+    for name, path in documents.items():
+        if name.startswith("pdf_"):
+            with fitz.open(path) as doc:
+                pages = doc.page_count
+
+            def extract_pdf(_i, path=path):
+                with open_path(path) as source:
+                    extract_from_pdf(source, reporter=Reporter())
+            results.append(measure(f"extract_from_pdf[{name}]", extract_pdf, args.repeat, args.warmup, pages, "쪽"))
+        else:
+            def extract_docx(_i, path=path):
+                with open_path(path) as source:
+                    extract_from_docx(source, reporter=Reporter())
+            results.append(measure(f"extract_from_docx[{name}]", extract_docx, args.repeat, args.warmup, 1, "문서"))
+
+    # 2. 프롬프트 구성 (가장 큰 PDF 본문 + 검색 결과 형태의 짧은 텍스트)
+    largest_pdf = max((path for name, path in documents.items() if name.startswith("pdf_")), key=os.path.getsize)
+    with open_path(largest_pdf) as source:
+        texts = extract_from_pdf(source)["text_content"]
+    texts += [f"제목: 관련 자료 {i}" for i in range(20)]
+    sources = [f"https://example.com/{i}" for i in range(20)]
+    input_tokens = sum(count_tokens(text) for text in texts)
+
+    def build_prompt(_i):
+        packed = pack_context("생성형 AI 시장 투자 동향", texts)
+        build_report_prompt("생성형 AI 시장 투자 동향", packed["chunks"], sources)
+    results.append(measure("generate_report.prompt_build", build_prompt, args.repeat, args.warmup,
+                           input_tokens, "입력 토큰"))
+
+    # 3. DOCX 생성
+    report = make_report(args.report_sections)
+    images = make_images(args.images)
+    results.append(measure("create_docx_report", lambda _i: create_docx_report(report, images),
+                           args.repeat, args.warmup, 1, "보고서"))
+
+    # 4. 전체 파이프라인 (대역 서버 경유, 회차마다 질의를 바꿔 캐시 적중을 피함)
+    for stream in (False, True):
+        def run_pipeline(i, stream=stream):
+            result = run_report_job({"user_query": f"생성형 AI 시장 동향 {stream} {i}", "stream": stream}, Reporter())
+            if not result["report"]:
+                raise RuntimeError("대역 서버 응답으로 보고서를 생성하지 못했습니다.")
+        name = "run_report_job[stream]" if stream else "run_report_job"
+        results.append(measure(name, run_pipeline, args.repeat, args.warmup, 1, "보고서"))
+
+    return results
+
+
+def print_results(results):
+    print(f"{'항목':<36} {'횟수':>4} {'p50(ms)':>10} {'p95(ms)':>10} {'처리량':>16}")
+    for result in results:
+        throughput = f"{result['throughput']:.1f} {result['unit']}/초" if result["throughput"] else "-"
+        print(f"{result['name']:<36} {result['runs']:>4} {result['p50'] * 1000:>10.1f} "
+              f"{result['p95'] * 1000:>10.1f} {throughput:>16}")
+
+
+def compare_baseline(results, baseline_path, tolerance):
+    """기준 결과와 p50 비교 후 회귀 항목 목록 반환"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {result["name"]: result for result in json.load(f)["results"]}
+
+    regressions = []
+    for result in results:
+        base = baseline.get(result["name"])
+        if base is None:
+            continue
+        limit = base["p50"] * (1 + tolerance)
+        if result["p50"] > limit and result["p50"] - base["p50"] > NOISE_FLOOR_SECONDS:
+            regressions.append(result["name"])
+            print(f"회귀: {result['name']} p50 {base['p50'] * 1000:.1f}ms → {result['p50'] * 1000:.1f}ms "
+                  f"(허용 {tolerance:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="항목별 측정 횟수")
+    parser.add_argument("--warmup", type=int, default=1, help="측정 전 예열 실행 횟수")
+    parser.add_argument("--latency", type=float, default=0.05, help="대역 서버 요청당 지연 (초)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="스트리밍 조각 간 지연 (초)")
+    parser.add_argument("--results", type=int, default=5, help="검색 결과 수")
+    parser.add_argument("--result-chars", type=int, default=800, help="검색 결과당 본문 길이")
+    parser.add_argument("--completion-chars", type=int, default=1500, help="보고서 응답 길이")
+    parser.add_argument("--pdf-pages", type=int, nargs="+", default=[5, 40, 200], help="합성 PDF 쪽수")
+    parser.add_argument("--docx-sections", type=int, nargs="+", default=[10, 80], help="합성 DOCX 섹션 수")
+    parser.add_argument("--doc-images", type=int, default=2, help="합성 문서 쪽/문서당 이미지 수")
+    parser.add_argument("--report-sections", type=int, default=20, help="DOCX 생성용 보고서 섹션 수")
+    parser.add_argument("--images", type=int, default=3, help="DOCX 생성용 이미지 수")
+    parser.add_argument("--docs-dir", help="합성 문서 보관 디렉터리 (기본: 임시 디렉터리)")
+    parser.add_argument("--json", help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", help="비교할 기준 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="p50 허용 증가율")
+    args = parser.parse_args()
+
+    config = MockConfig(latency=args.latency, token_delay=args.token_delay, results=args.results,
+                        result_chars=args.result_chars, completion_chars=args.completion_chars)
+    server, base_url = start_mock_server(config)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        configure_environment(base_url, os.path.join(temp_dir, "cache"))
+        documents = make_corpus(args.docs_dir or os.path.join(temp_dir, "docs"),
+                                args.pdf_pages, args.docx_sections, args.doc_images)
+        check_report_sections(config)
+        results = run_benchmarks(args, documents)
+    server.shutdown()
+
+    print(f"대역 서버 지연 {args.latency * 1000:.0f}ms, 요청 수: {json.dumps(config.requests, ensure_ascii=False)}")
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+
+    if args.baseline and compare_baseline(results, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
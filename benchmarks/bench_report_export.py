@@ -0,0 +1,86 @@
+"""보고서 파일 생성 벤치마크: PDF/DOCX 생성 시간, 초당 페이지 수, 파일 크기 비교
+
+실행: python benchmarks/bench_report_export.py [--sections 5 20 80] [--images 3] [--repeat 3]
+"""
+import os
+import io
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from PIL import Image
+from images import PreparedImage, normalize_image
+from exports import create_docx_report, create_pdf_report, PDF_SUBSET_FONTS
+
+PARAGRAPH = (
+    "생성형 AI 시장은 2025년까지 연평균 38% 성장할 것으로 예상되며, 주요 기업들은 "
+    "**클라우드 인프라**와 반도체 투자를 확대하고 있다. Enterprise adoption continues to grow "
+    "across finance, healthcare and manufacturing. 자세한 내용은 [시장 보고서](https://example.com/report) 참조."
+)
+
+
+def make_report(sections):
+    """제목/목록/링크/긴 문단이 섞인 합성 보고서 마크다운"""
+    lines = ["# 생성형 AI 산업 동향 보고서", "", PARAGRAPH, ""]
+    for i in range(sections):
+        lines.append(f"## {i + 1}. 세부 동향")
+        lines.append("")
+        lines.extend([PARAGRAPH, PARAGRAPH, ""])
+        lines.append(f"### {i + 1}.1 주요 수치")
+        lines.extend([f"- 항목 {j + 1}: 전년 대비 {10 + j}% 증가 https://example.com/{i}/{j}" for j in range(4)])
+        lines.append("")
+    lines.append("참고 링크:")
+    lines.extend([f"- [출처 {i + 1}](https://example.com/source/{i})" for i in range(5)])
+    return "\n".join(lines)
+
+
+def make_images(count):
+    """정규화된 합성 이미지 (네트워크 없이 실제 보고서 이미지 경로와 같은 형태)"""
+    images = []
+    for i in range(count):
+        buffer = io.BytesIO()
+        Image.effect_noise((1600, 900), 40 + i * 10).convert("RGB").save(buffer, format="PNG")
+        data, mime, width, height = normalize_image(buffer.getvalue())
+        images.append((PreparedImage(data, mime, width, height, f"bench:{i}"), f"이미지 {i + 1}"))
+    return images
+
+
+def measure(builder, report, images, repeat):
+    timings = []
+    data = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        data = builder(report, images)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sections", type=int, nargs="+", default=[5, 20, 80])
+    parser.add_argument("--images", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    images = make_images(args.images)
+    print(f"폰트 서브셋: {'사용' if PDF_SUBSET_FONTS else '미사용 (fontTools 없음)'}")
+    print(f"{'섹션':>6} {'페이지':>6} {'PDF(초)':>9} {'페이지/초':>9} {'PDF(KB)':>9} {'DOCX(초)':>9} {'DOCX(KB)':>9}")
+
+    for sections in args.sections:
+        report = make_report(sections)
+        pdf_seconds, pdf_data = measure(create_pdf_report, report, images, args.repeat)
+        docx_seconds, docx_data = measure(create_docx_report, report, images, args.repeat)
+
+        with fitz.open(stream=pdf_data, filetype="pdf") as doc:
+            pages = doc.page_count
+
+        print(f"{sections:>6} {pages:>6} {pdf_seconds:>9.3f} {pages / pdf_seconds:>9.1f} "
+              f"{len(pdf_data) / 1024:>9.1f} {docx_seconds:>9.3f} {len(docx_data) / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""계층 요약(map/collapse) 벤치마크: 로컬 대역 LLM으로 워커 수별 소요 시간과 단계별 호출/토큰 수 측정
+
+실행: python benchmarks/bench_summarize.py [--pages 200 800] [--latency 0.05] [--workers 1 4 8]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_docs import make_pdf
+from extraction import iter_page_range
+from context import count_tokens
+from ingest import open_pdf
+from summarize import summarize_context, make_stub_llm
+
+QUERY = "문서의 주요 내용과 수치를 요약"
+
+
+def extract_texts(path):
+    with open_pdf(path) as doc:
+        page_count = doc.page_count
+    return [page["text"] for page in iter_page_range(path, 0, page_count) if page["text"].strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 800])
+    parser.add_argument("--latency", type=float, default=0.05, help="대역 LLM 호출당 지연(초)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--reduce-budget", type=int, default=None, help="collapse 기준 토큰 예산 (기본: CONTEXT_TOKEN_BUDGET)")
+    args = parser.parse_args()
+
+    llm = make_stub_llm(args.latency)
+    print(f"{'문서':<22} {'토큰':>9} {'워커':>4} {'시간(초)':>9} {'청크':>6} {'요약':>5}  단계별 호출(토큰)")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for pages in args.pages:
+            name = f"synthetic_{pages}p.pdf"
+            texts = extract_texts(make_pdf(os.path.join(temp_dir, name), pages))
+            tokens = sum(count_tokens(text) for text in texts)
+            for workers in args.workers:
+                started = time.perf_counter()
+                summaries, stats = summarize_context(QUERY, texts, llm, reduce_budget=args.reduce_budget,
+                                                     max_workers=workers)
+                elapsed = time.perf_counter() - started
+                stages = ", ".join(
+                    f"{name} {stage['calls']}회({stage['prompt_tokens']}+{stage['completion_tokens']})"
+                    for name, stage in stats["stages"].items()
+                )
+                print(f"{name:<22} {tokens:>9} {workers:>4} "
+                      f"{elapsed:>9.3f} {stats['chunks']:>6} {stats['summaries']:>5}  {stages}")
+
+
+if __name__ == "__main__":
+    main()
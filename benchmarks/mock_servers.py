@@ -0,0 +1,205 @@
+"""Firecrawl/OpenAI 대역 서버 (유료 API 없이 파이프라인 측정용)
+
+실행: python benchmarks/mock_servers.py --port 8765 --latency 0.2 --results 8 --result-chars 1500
+앱/배치에서 사용: FIRECRAWL_BASE_URL=http://127.0.0.1:8765 OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+
+지원 경로: POST /v1/search, POST /v1/scrape, POST /v1/chat/completions (stream 포함), GET /images/<이름>.png
+"""
+import io
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from PIL import Image
+
+SNIPPET = (
+    "생성형 AI 시장은 클라우드 인프라와 반도체 투자 확대에 힘입어 빠르게 성장하고 있다. "
+    "Enterprise adoption continues across finance, healthcare and manufacturing. "
+)
+
+REPORT = (
+    "# 생성형 AI 산업 동향\n\n"
+    "생성형 AI 시장이 2025년까지 연평균 38% 성장할 전망이다.\n\n"
+    "## 주요 동향\n"
+    "- 클라우드 사업자의 인프라 투자 확대\n"
+    "- 산업별 도입 사례 증가\n\n"
+)
+
+REPORT_SOURCES = "\n\n## 참고 링크:\n- [https://example.com/1](https://example.com/1)\n"
+
+
+def repeat_text(text, chars):
+    """text를 반복해 chars 길이로 맞춤"""
+    if chars <= 0:
+        return ""
+    return (text * (chars // len(text) + 1))[:chars]
+
+
+class MockConfig:
+    """응답 지연과 크기 설정, 경로별 요청 수"""
+
+    def __init__(self, latency=0.0, token_delay=0.0, results=5, result_chars=800,
+                 scrape_chars=3000, completion_chars=1500, image_size=(800, 600), images=True, report=None):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.results = results
+        self.result_chars = result_chars
+        self.scrape_chars = scrape_chars
+        self.completion_chars = completion_chars
+        self.image_size = image_size
+        self.images = images
+        # 보고서 응답 전체를 지정 (None이면 SECTION_FORMAT을 따르는 기본 보고서)
+        self.report = report
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._image_data = None
+
+    def count(self, path):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def image_data(self):
+        """이미지 응답 (한 번 만들어 재사용)"""
+        with self._lock:
+            if self._image_data is None:
+                buffer = io.BytesIO()
+                Image.effect_noise(self.image_size, 40).convert("RGB").save(buffer, format="PNG")
+                self._image_data = buffer.getvalue()
+            return self._image_data
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+    base_url = ""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        self.config.count(path.rsplit("/", 1)[0] if path.startswith("/images/") else path)
+        if not path.startswith("/images/"):
+            self.send_error(404)
+            return
+        time.sleep(self.config.latency)
+        self._send(self.config.image_data(), "image/png")
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        path = self.path.split("?")[0]
+        self.config.count(path)
+        time.sleep(self.config.latency)
+
+        if path == "/v1/search":
+            self._send_json(self._search(body.get("query", "")))
+        elif path == "/v1/scrape":
+            self._send_json({"success": True, "data": {"markdown": repeat_text(SNIPPET, self.config.scrape_chars)}})
+        elif path == "/v1/chat/completions":
+            text = self.config.report or (
+                REPORT + repeat_text(SNIPPET, max(0, self.config.completion_chars - len(REPORT))) + REPORT_SOURCES)
+            if body.get("stream"):
+                self._stream_completion(body, text)
+            else:
+                self._send_json(self._completion(body, text))
+        else:
+            self.send_error(404)
+
+    def _search(self, query):
+        # 질의마다 다른 URL을 만들어 캐시/중복 제거가 측정을 왜곡하지 않도록 함
+        digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:8]
+        data = []
+        for i in range(self.config.results):
+            item = {
+                "url": f"https://example.com/{digest}/{i}",
+                "title": f"{query} 관련 자료 {i + 1}",
+                "snippet": repeat_text(f"{query}: " + SNIPPET, self.config.result_chars)
+            }
+            if self.config.images and i < 3:
+                item["image"] = f"{self.base_url}/images/{digest}-{i}.png"
+            data.append(item)
+        return {"success": True, "data": data}
+
+    def _completion(self, body, text):
+        prompt_chars = sum(len(message.get("content") or "") for message in body.get("messages", []))
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_chars // 2, "completion_tokens": len(text) // 2,
+                      "total_tokens": (prompt_chars + len(text)) // 2}
+        }
+
+    def _stream_completion(self, body, text):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for start in range(0, len(text), 16):
+            time.sleep(self.config.token_delay)
+            chunk = {
+                "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "delta": {"content": text[start:start + 16]}, "finish_reason": None}]
+            }
+            self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, payload):
+        self._send(json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def _send(self, data, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_mock_server(config=None, host="127.0.0.1", port=0):
+    """대역 서버를 백그라운드 스레드로 시작하고 (서버, 기본 URL) 반환 (port=0이면 빈 포트 사용)"""
+    config = config or MockConfig()
+    handler = type("BoundMockHandler", (MockHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    handler.base_url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True, name="mock-api").start()
+    return server, handler.base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Firecrawl/OpenAI 대역 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="요청당 응답 지연 (초)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="스트리밍 조각 간 지연 (초)")
+    parser.add_argument("--results", type=int, default=5, help="검색 결과 수")
+    parser.add_argument("--result-chars", type=int, default=800, help="검색 결과당 본문 길이")
+    parser.add_argument("--scrape-chars", type=int, default=3000, help="스크랩 본문 길이")
+    parser.add_argument("--completion-chars", type=int, default=1500, help="보고서 응답 길이")
+    args = parser.parse_args()
+
+    config = MockConfig(latency=args.latency, token_delay=args.token_delay, results=args.results,
+                        result_chars=args.result_chars, scrape_chars=args.scrape_chars,
+                        completion_chars=args.completion_chars)
+    server, base_url = start_mock_server(config, args.host, args.port)
+    print(f"대역 서버 실행 중: {base_url} (Ctrl+C로 종료)")
+    print(f"FIRECRAWL_BASE_URL={base_url} OPENAI_BASE_URL={base_url}/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""벤치마크용 합성 PDF/DOCX 생성 (페이지 수, 이미지 수를 바꿔 가며 같은 문서를 재현)"""
+import io
+import os
+import fitz  # PyMuPDF
+from PIL import Image
+from docx import Document
+from docx.shared import Inches
+
+PARAGRAPH = (
+    "생성형 AI 시장은 2025년까지 연평균 38% 성장할 것으로 예상되며, 주요 기업들은 클라우드 인프라와 "
+    "반도체 투자를 확대하고 있다. Enterprise adoption continues to grow across finance, healthcare "
+    "and manufacturing, while regulators publish new guidance on model transparency."
+)
+
+
+def make_png(seed, size=(640, 480)):
+    """seed별로 내용이 다른 PNG (이미지 중복 제거가 측정을 줄이지 않도록)"""
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 20 + seed % 80).convert("RGB").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_pdf(path, pages, images_per_page=0, paragraphs_per_page=6):
+    """머리글/바닥글/쪽 번호, 본문 문단과 이미지가 들어간 PDF 생성"""
+    images = [make_png(i) for i in range(min(images_per_page * pages, 8))]
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((56, 36), "생성형 AI 산업 동향 보고서 | 리서치센터", fontsize=8, fontname="korea")
+        page.insert_text((56, 816), "본 자료는 투자 판단의 참고용입니다. 무단 배포 금지", fontsize=7, fontname="korea")
+        page.insert_text((520, 816), f"{page_number + 1} / {pages}", fontsize=8)
+        text = f"{page_number + 1}쪽 세부 동향\n\n" + "\n\n".join([PARAGRAPH] * paragraphs_per_page)
+        page.insert_textbox(fitz.Rect(56, 72, 539, 560), text, fontsize=10, fontname="korea")
+        for i in range(images_per_page):
+            # 이미지 일부는 여러 페이지에 반복 사용 (실제 문서의 로고/반복 도판과 같은 형태)
+            data = images[(page_number * images_per_page + i) % len(images)]
+            left = 56 + i * 160
+            page.insert_image(fitz.Rect(left, 580, left + 150, 700), stream=data)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    return path
+
+
+def make_docx(path, sections, images=0, tables=0):
+    """머리글/바닥글, 제목/문단/목록/표/이미지가 들어간 DOCX 생성"""
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "생성형 AI 산업 동향 | 대외비"
+    doc.sections[0].footer.paragraphs[0].text = "리서치센터 작성"
+    doc.add_heading("생성형 AI 산업 동향 보고서", level=0)
+    for i in range(sections):
+        doc.add_heading(f"{i + 1}. 세부 동향", level=1)
+        doc.add_paragraph(PARAGRAPH)
+        doc.add_paragraph(PARAGRAPH)
+        doc.add_paragraph(f"항목 {i + 1}: 전년 대비 {10 + i}% 증가", style="List Bullet")
+    for i in range(tables):
+        table = doc.add_table(rows=4, cols=3)
+        for row_index, row in enumerate(table.rows):
+            for col_index, cell in enumerate(row.cells):
+                cell.text = f"표 {i + 1} 값 {row_index}-{col_index}"
+    pictures = [make_png(i) for i in range(min(images, 8))]
+    for i in range(images):
+        # 8개를 넘으면 같은 그림을 반복 배치 (중복 제거 측정용)
+        doc.add_picture(io.BytesIO(pictures[i % len(pictures)]), width=Inches(4))
+        doc.add_paragraph(f"그림 {i + 1}", style="Caption")
+    doc.save(path)
+    return path
+
+
+def make_corpus(directory, pdf_pages=(5, 40, 200), docx_sections=(10, 80), images=2):
+    """크기별 합성 문서 묶음 생성 후 {이름: 경로} 반환 (이미 있으면 재사용)"""
+    os.makedirs(directory, exist_ok=True)
+    documents = {}
+    for pages in pdf_pages:
+        path = os.path.join(directory, f"synthetic_{pages}p_{images}img.pdf")
+        if not os.path.exists(path):
+            make_pdf(path, pages, images_per_page=images)
+        documents[f"pdf_{pages}p"] = path
+    for sections in docx_sections:
+        path = os.path.join(directory, f"synthetic_{sections}s_{images}img.docx")
+        if not os.path.exists(path):
+            make_docx(path, sections, images=images, tables=2)
+        documents[f"docx_{sections}s"] = path
+    return documents
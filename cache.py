@@ -0,0 +1,290 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+# ----- 추출 결과 캐시 설정 -----
+
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+# 추출 캐시 전체 크기 상한 (초과 시 오래 사용하지 않은 항목부터 제거)
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MB", "512")) * 1024 * 1024
+
+
+class ExtractionCache:
+    """파일 해시 기반 추출 결과 캐시 (SQLite, 크기 기준 LRU 제거)"""
+
+    def __init__(self, path=None, max_bytes=None):
+        if path is None:
+            path = os.path.join(CACHE_DIR, "extraction.sqlite")
+        if max_bytes is None:
+            max_bytes = EXTRACTION_CACHE_MAX_BYTES
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, payload BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        # Streamlit 스크립트 스레드마다 별도 연결을 열고 작업 후 커밋/종료
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(file_hash, kind, version):
+        """캐시 키 생성 (파일 SHA-256 + 문서 종류 + 추출기 버전)"""
+        return f"{file_hash}:{kind}:{version}"
+
+    def get(self, key):
+        """캐시 조회 (없으면 None)"""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT payload FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+
+        self.hits += 1
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, key, value):
+        """캐시 저장 후 크기 상한을 넘으면 LRU 제거"""
+        payload = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        now = time.time()
+
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, payload, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now)
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        """전체 크기가 상한 이하가 될 때까지 가장 오래 사용하지 않은 항목 제거"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        """캐시 전체 삭제"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self):
+        """캐시 상태 (항목 수, 크기, 적중/미스/제거 횟수)"""
+        with self._connect() as conn:
+            entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+class TTLCache:
+    """스레드 안전 인메모리 TTL 캐시 (항목 수 초과 시 LRU 제거)"""
+
+    def __init__(self, ttl, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """캐시 조회 (없거나 만료되었으면 None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """캐시 저장"""
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """캐시 상태 (항목 수, 적중/미스 횟수)"""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class RequestCoalescer:
+    """같은 키의 동시 요청을 하나의 실제 호출로 합침"""
+
+    def __init__(self):
+        self.coalesced = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, func, *args, **kwargs):
+        """진행 중인 같은 키의 호출이 있으면 그 결과를 기다리고, 없으면 직접 실행"""
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+
+class DirectoryCache:
+    """디렉터리 기반 바이트 캐시 (파일명 = 키 해시, 총 크기 상한 초과 시 오래 사용하지 않은 파일부터 제거)"""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        # 총 크기는 메모리에서 추적하고 디렉터리 전체 스캔은 시작할 때와 상한을 넘었을 때만 수행
+        self._bytes = sum(size for _mtime, size, _path in self._scan())
+
+    def _file(self, key):
+        return os.path.join(self.path, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def get(self, key):
+        """캐시 조회 (없으면 None)"""
+        path = self._file(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # 최근 사용 시각 갱신 (LRU)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """캐시 저장 (임시 파일에 쓴 뒤 교체) 후 크기 상한 유지"""
+        path = self._file(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+
+        with self._lock:
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(temp_path, path)
+            self._bytes += len(data) - replaced
+            if self._needs_evict():
+                self._evict()
+
+    def _discard(self, path):
+        """항목 파일 제거 후 추적 중인 총 크기 갱신"""
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                return False
+            self._bytes -= size
+            return True
+
+    def _scan(self):
+        """(최근 사용 시각, 크기, 경로) 목록 (쓰는 중인 임시 파일 제외)"""
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _needs_evict(self):
+        return self._bytes > self.max_bytes
+
+    def _evict(self):
+        # 다른 프로세스가 같은 디렉터리를 쓸 수 있으므로 제거할 때는 실제 파일 기준으로 총 크기를 다시 계산
+        entries = self._scan()
+        total = sum(size for _mtime, size, _path in entries)
+        for _mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._bytes = total
+
+    def stats(self):
+        return {"bytes": self._bytes, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+
+_extraction_cache = None
+_extraction_cache_lock = threading.Lock()
+
+
+def get_extraction_cache():
+    """프로세스 공용 추출 캐시"""
+    global _extraction_cache
+    with _extraction_cache_lock:
+        if _extraction_cache is None:
+            _extraction_cache = ExtractionCache()
+        return _extraction_cache
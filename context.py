@@ -0,0 +1,199 @@
+import os
+import re
+import math
+from collections import Counter
+
+try:
+    import tiktoken
+except ImportError:  # 선택 의존성: 없으면 근사 토큰 수 사용
+    tiktoken = None
+
+# ----- 프롬프트 컨텍스트 패킹 설정 -----
+
+# 수집 정보에 할당할 기본 토큰 예산 (gpt-4 8K 컨텍스트 - 응답 3000 - 지시문 여유분)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+
+# 청크 하나의 목표 토큰 수
+CHUNK_TOKENS = int(os.getenv("CONTEXT_CHUNK_TOKENS", "300"))
+
+# 이 유사도 이상이면 거의 같은 문단으로 보고 제외
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+# BM25 파라미터
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+HANGUL_PATTERN = re.compile(r"[가-힣]")
+
+_encoding = None
+
+
+def count_tokens(text):
+    """토큰 수 계산 (tiktoken이 없으면 ASCII 4자당 1토큰, 그 외 문자 1자당 1토큰으로 근사)"""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text))
+
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+def split_long_text(text, chunk_tokens):
+    """청크 크기를 넘는 문단을 줄 단위, 그래도 길면 단어 묶음 단위로 분할"""
+    pieces = []
+    for line in text.split("\n"):
+        if not line.strip():
+            continue
+        tokens = count_tokens(line)
+        if tokens <= chunk_tokens:
+            pieces.append((line, tokens))
+            continue
+
+        words = []
+        words_tokens = 0
+        for word in line.split():
+            word_tokens = count_tokens(word) + 1
+            if words and words_tokens + word_tokens > chunk_tokens:
+                pieces.append((" ".join(words), words_tokens))
+                words, words_tokens = [], 0
+            words.append(word)
+            words_tokens += word_tokens
+        if words:
+            pieces.append((" ".join(words), words_tokens))
+    return pieces
+
+
+def split_chunks(texts, chunk_tokens=None):
+    """수집된 텍스트를 문단 경계 기준으로 비슷한 크기의 청크로 분할"""
+    if chunk_tokens is None:
+        chunk_tokens = CHUNK_TOKENS
+
+    chunks = []
+    for source_index, text in enumerate(texts):
+        paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+
+        current = []
+        current_tokens = 0
+        for paragraph in paragraphs:
+            tokens = count_tokens(paragraph)
+
+            # 너무 긴 문단은 줄/단어 단위로 나눔
+            pieces = [(paragraph, tokens)]
+            if tokens > chunk_tokens:
+                pieces = split_long_text(paragraph, chunk_tokens)
+
+            for piece, piece_tokens in pieces:
+                if current and current_tokens + piece_tokens > chunk_tokens:
+                    chunks.append({"source": source_index, "text": "\n".join(current), "tokens": current_tokens})
+                    current, current_tokens = [], 0
+                current.append(piece)
+                current_tokens += piece_tokens
+
+        if current:
+            chunks.append({"source": source_index, "text": "\n".join(current), "tokens": current_tokens})
+
+    for position, chunk in enumerate(chunks):
+        chunk["position"] = position
+    return chunks
+
+
+def tokenize_terms(text):
+    """검색용 용어 추출 (소문자 단어 + 한글 음절 bigram으로 조사 변화 흡수)"""
+    terms = []
+    for word in WORD_PATTERN.findall(text.lower()):
+        terms.append(word)
+        if HANGUL_PATTERN.search(word) and len(word) > 2:
+            terms.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return terms
+
+
+def bm25_scores(query, documents):
+    """질의에 대한 문서별 BM25 점수"""
+    query_terms = set(tokenize_terms(query))
+    if not query_terms or not documents:
+        return [0.0] * len(documents)
+
+    doc_terms = [Counter(tokenize_terms(doc)) for doc in documents]
+    doc_lengths = [sum(terms.values()) for terms in doc_terms]
+    avg_length = (sum(doc_lengths) / len(doc_lengths)) or 1.0
+
+    doc_freq = Counter()
+    for terms in doc_terms:
+        doc_freq.update(query_terms & terms.keys())
+
+    n = len(documents)
+    scores = []
+    for terms, length in zip(doc_terms, doc_lengths):
+        score = 0.0
+        for term in query_terms:
+            tf = terms.get(term, 0)
+            if not tf:
+                continue
+            idf = math.log(1 + (n - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+        scores.append(score)
+    return scores
+
+
+def shingles(text, size=5):
+    """근접 중복 판별용 문자 shingle 집합 (공백 정규화)"""
+    normalized = " ".join(text.lower().split())
+    if len(normalized) <= size:
+        return {normalized}
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def pack_context(user_query, texts, token_budget=None, chunk_tokens=None):
+    """질의 관련도 순으로 중복을 제거하며 토큰 예산 안에 청크를 채움 (원래 순서로 반환)"""
+    if token_budget is None:
+        token_budget = CONTEXT_TOKEN_BUDGET
+
+    chunks = split_chunks(texts, chunk_tokens)
+    total_tokens = sum(chunk["tokens"] for chunk in chunks)
+
+    # 질의가 없으면 원래 순서를 그대로 우선순위로 사용
+    scores = bm25_scores(user_query or "", [chunk["text"] for chunk in chunks])
+    ranked = sorted(chunks, key=lambda c: (-scores[c["position"]], c["position"]))
+
+    selected = []
+    selected_shingles = []
+    used_tokens = 0
+    duplicates = 0
+
+    for chunk in ranked:
+        if used_tokens + chunk["tokens"] > token_budget:
+            continue
+
+        chunk_shingles = shingles(chunk["text"])
+        if any(jaccard(chunk_shingles, other) >= NEAR_DUPLICATE_THRESHOLD for other in selected_shingles):
+            duplicates += 1
+            continue
+
+        selected.append(chunk)
+        selected_shingles.append(chunk_shingles)
+        used_tokens += chunk["tokens"]
+
+    # 프롬프트 가독성을 위해 원래 순서로 복원
+    selected.sort(key=lambda c: c["position"])
+
+    return {
+        "chunks": [chunk["text"] for chunk in selected],
+        "stats": {
+            "total_chunks": len(chunks),
+            "packed_chunks": len(selected),
+            "duplicate_chunks": duplicates,
+            "total_tokens": total_tokens,
+            "packed_tokens": used_tokens,
+            "dropped_tokens": total_tokens - used_tokens,
+            "token_budget": token_budget
+        }
+    }
@@ -0,0 +1,156 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from cache import CACHE_DIR
+from context import split_chunks, tokenize_terms
+
+# ----- 로컬 문서 코퍼스 (여러 보고서에서 재사용하는 문서 색인) -----
+
+# 보고서 생성 시 코퍼스에서 가져올 기본 청크 수
+CORPUS_TOP_K = int(os.getenv("CORPUS_TOP_K", "20"))
+
+# 검색 질의에 사용할 최대 용어 수 (긴 질의로 인한 검색 지연 방지)
+MAX_QUERY_TERMS = 64
+
+
+class Corpus:
+    """문서별 청크와 역색인(SQLite FTS5, BM25 순위)을 디스크에 보관하는 코퍼스 (문서 단위로 추가/삭제)"""
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(CACHE_DIR, "corpus.sqlite")
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "id INTEGER PRIMARY KEY, name TEXT NOT NULL, sha256 TEXT NOT NULL UNIQUE, "
+                "chunks INTEGER NOT NULL, tokens INTEGER NOT NULL, added REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "id INTEGER PRIMARY KEY, document_id INTEGER NOT NULL, position INTEGER NOT NULL, "
+                "text TEXT NOT NULL, tokens INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS chunks_document ON chunks (document_id)")
+            # 색인에는 원문 대신 tokenize_terms 결과(단어 + 한글 bigram)를 넣어 pack_context의 BM25와 같은 기준으로 검색
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunk_terms USING fts5(terms)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add_document(self, name, sha256, text_content, chunk_tokens=None):
+        """문서 텍스트를 청크로 나눠 색인 (같은 내용의 문서가 이미 있으면 기존 ID 반환)"""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT id FROM documents WHERE sha256 = ?", (sha256,)).fetchone()
+            if row is not None:
+                return row[0], False
+
+            chunks = split_chunks(text_content, chunk_tokens)
+            cursor = conn.execute(
+                "INSERT INTO documents (name, sha256, chunks, tokens, added) VALUES (?, ?, ?, ?, ?)",
+                (name, sha256, len(chunks), sum(chunk["tokens"] for chunk in chunks), time.time())
+            )
+            document_id = cursor.lastrowid
+
+            for chunk in chunks:
+                chunk_id = conn.execute(
+                    "INSERT INTO chunks (document_id, position, text, tokens) VALUES (?, ?, ?, ?)",
+                    (document_id, chunk["position"], chunk["text"], chunk["tokens"])
+                ).lastrowid
+                conn.execute("INSERT INTO chunk_terms (rowid, terms) VALUES (?, ?)",
+                             (chunk_id, " ".join(tokenize_terms(chunk["text"]))))
+            return document_id, True
+
+    def remove_document(self, document_id):
+        """문서와 청크, 색인 항목 삭제"""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "DELETE FROM chunk_terms WHERE rowid IN (SELECT id FROM chunks WHERE document_id = ?)",
+                (document_id,)
+            )
+            conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+            conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+
+    def documents(self):
+        """색인된 문서 목록 (최근 추가 순)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, name, sha256, chunks, tokens, added FROM documents ORDER BY added DESC"
+            ).fetchall()
+        return [
+            {"id": id_, "name": name, "sha256": sha256, "chunks": chunks, "tokens": tokens, "added": added}
+            for id_, name, sha256, chunks, tokens, added in rows
+        ]
+
+    def search(self, query, top_k=None, document_ids=None):
+        """질의와 관련도가 높은 청크 top_k개 (BM25 점수 순)"""
+        if top_k is None:
+            top_k = CORPUS_TOP_K
+
+        terms = list(dict.fromkeys(tokenize_terms(query or "")))[:MAX_QUERY_TERMS]
+        if not terms or top_k <= 0:
+            return []
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+        sql = (
+            "SELECT chunks.id, chunks.document_id, documents.name, chunks.position, chunks.text, "
+            "bm25(chunk_terms) AS score FROM chunk_terms "
+            "JOIN chunks ON chunks.id = chunk_terms.rowid "
+            "JOIN documents ON documents.id = chunks.document_id "
+            "WHERE chunk_terms MATCH ?"
+        )
+        args = [match]
+        if document_ids is not None:
+            if not document_ids:
+                return []
+            sql += f" AND chunks.document_id IN ({', '.join('?' * len(document_ids))})"
+            args.extend(document_ids)
+        sql += " ORDER BY score LIMIT ?"
+        args.append(top_k)
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, args).fetchall()
+        # FTS5의 bm25()는 낮을수록 관련도가 높으므로 부호를 바꿔 반환
+        return [
+            {"id": id_, "document_id": document_id, "document": name, "position": position,
+             "text": text, "score": round(-score, 4)}
+            for id_, document_id, name, position, text, score in rows
+        ]
+
+    def stats(self):
+        """문서 수, 청크 수, 토큰 수, 파일 크기"""
+        with self._connect() as conn:
+            documents, chunks, tokens = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunks), 0), COALESCE(SUM(tokens), 0) FROM documents"
+            ).fetchone()
+        return {
+            "documents": documents,
+            "chunks": chunks,
+            "tokens": tokens,
+            "bytes": os.path.getsize(self.path)
+        }
+
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+
+def get_corpus():
+    """프로세스 공용 코퍼스"""
+    global _corpus
+    with _corpus_lock:
+        if _corpus is None:
+            _corpus = Corpus()
+        return _corpus
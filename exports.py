@@ -0,0 +1,268 @@
+import io
+import os
+import re
+import html
+import hashlib
+import tempfile
+import importlib.util
+from images import image_bytes, image_identity, prepare_image
+from cache import TTLCache
+from artifacts import get_artifact_store
+import metrics
+
+# ----- 보고서 파일(DOCX/PDF) 생성 -----
+
+# 생성된 파일 메모이즈 (같은 보고서 내용 + 이미지 구성이면 재사용, 파일 바이트는 산출물 저장소에 두고 핸들만 보관)
+ARTIFACT_CACHE_TTL = int(os.getenv("ARTIFACT_CACHE_TTL", "3600"))
+artifact_cache = TTLCache(ttl=ARTIFACT_CACHE_TTL, max_entries=32)
+
+# PDF 페이지 크기(pt)와 여백 (A4, 여백 20mm)
+PDF_PAGE_SIZE = (595, 842)
+PDF_MARGIN = 56
+
+# PDF 이미지 폭 (DOCX와 같은 5인치)
+PDF_IMAGE_WIDTH = 5 * 72
+
+# 한글은 MuPDF 내장 CJK 폰트로 대체 렌더링됨. fontTools가 있으면 사용한 글자만 남겨 용량을 줄임
+PDF_SUBSET_FONTS = importlib.util.find_spec("fontTools") is not None
+
+PDF_CSS = """
+body { font-family: sans-serif; font-size: 11pt; line-height: 1.5; }
+h1 { font-size: 20pt; margin-bottom: 8pt; }
+h2 { font-size: 16pt; margin-top: 12pt; }
+h3 { font-size: 13pt; margin-top: 8pt; }
+a { color: #1a56db; }
+p.caption { font-size: 9pt; color: #555555; text-align: center; }
+"""
+
+LINK_PATTERN = re.compile(r"\[([^\]]+)\]\((https?://[^)\s]+)\)|(https?://[^\s<>()]+)")
+BOLD_PATTERN = re.compile(r"\*\*(.+?)\*\*")
+
+
+def create_docx_report(report_content, images=None):
+    """DOCX 형식 보고서 생성"""
+    # python-docx/PyMuPDF는 파일을 만들 때만 로드 (앱 시작 시 import 비용 제외)
+    from docx import Document
+    from docx.shared import Inches
+
+    doc = Document()
+
+    # 마크다운을 기본 텍스트로 변환 (간단한 처리)
+    lines = report_content.split('\n')
+    current_paragraph = None
+
+    for line in lines:
+        if line.startswith('# '):
+            # 큰 제목
+            doc.add_heading(line[2:], level=0)
+        elif line.startswith('## '):
+            # 중간 제목
+            doc.add_heading(line[3:], level=1)
+        elif line.startswith('### '):
+            # 작은 제목
+            doc.add_heading(line[4:], level=2)
+        elif line.startswith('- '):
+            # 목록
+            doc.add_paragraph(line[2:], style='ListBullet')
+        elif line.strip() == '':
+            # 빈 줄
+            if current_paragraph:
+                current_paragraph = None
+        else:
+            # 일반 문단
+            if not current_paragraph:
+                current_paragraph = doc.add_paragraph()
+            current_paragraph.add_run(line)
+
+    # 이미지 추가 (이미지가 있는 경우)
+    if images:
+        doc.add_heading('관련 이미지', level=1)
+        for img_url, caption in images:
+            try:
+                # PDF 이미지 참조, Base64 이미지, URL 이미지(로컬 캐시 경유) 모두 바이트로 변환
+                img_stream = io.BytesIO(image_bytes(img_url))
+                doc.add_picture(img_stream, width=Inches(5))  # docx.shared.Inches → Inches로 수정
+
+                # 캡션 추가 (스타일 이름 사용)
+                doc.add_paragraph(caption, style='Caption')
+            except Exception as e:
+                error_msg = f"이미지 추가 오류: {str(e)}"
+                print(error_msg)
+
+    # 메모리 스트림에 저장
+    docx_stream = io.BytesIO()
+    doc.save(docx_stream)
+    docx_stream.seek(0)
+
+    data = docx_stream.getvalue()
+    metrics.record(bytes_out=len(data))
+    return data
+
+
+def _inline_html(text):
+    """굵게 표시만 변환한 HTML 조각"""
+    return BOLD_PATTERN.sub(r"<b>\1</b>", html.escape(text))
+
+
+def markdown_inline_html(text):
+    """한 줄의 마크다운 링크([제목](URL), 맨 URL)와 굵게 표시를 HTML로 변환"""
+    parts = []
+    position = 0
+    for match in LINK_PATTERN.finditer(text):
+        label, url, bare_url = match.groups()
+        url = url or bare_url
+        parts.append(_inline_html(text[position:match.start()]))
+        parts.append(f'<a href="{html.escape(url)}">{_inline_html(label or bare_url)}</a>')
+        position = match.end()
+    parts.append(_inline_html(text[position:]))
+    return "".join(parts)
+
+
+def markdown_to_html(report_content):
+    """보고서 마크다운을 PDF 레이아웃용 HTML로 변환 (DOCX 변환과 같은 규칙)"""
+    blocks = []
+    paragraph = []
+    bullets = []
+
+    def flush():
+        if paragraph:
+            blocks.append(f"<p>{' '.join(paragraph)}</p>")
+            paragraph.clear()
+        if bullets:
+            blocks.append("<ul>" + "".join(f"<li>{item}</li>" for item in bullets) + "</ul>")
+            bullets.clear()
+
+    for line in report_content.split('\n'):
+        heading = re.match(r"(#{1,3}) (.*)", line)
+        if heading:
+            flush()
+            level = len(heading.group(1))
+            blocks.append(f"<h{level}>{markdown_inline_html(heading.group(2))}</h{level}>")
+        elif line.startswith('- '):
+            if paragraph:
+                flush()
+            bullets.append(markdown_inline_html(line[2:]))
+        elif line.strip() == '':
+            flush()
+        else:
+            if bullets:
+                flush()
+            paragraph.append(markdown_inline_html(line))
+    flush()
+    return "\n".join(blocks)
+
+
+def _pdf_image_html(images, archive):
+    """이미지를 정규화해 archive에 넣고 이미지 영역 HTML 반환"""
+    blocks = []
+    for i, (img_url, caption) in enumerate(images):
+        try:
+            prepared = prepare_image(img_url)
+            name = f"image{i}.{prepared.mime.split('/')[-1]}"
+            archive.add(prepared.data, name)
+            width = min(PDF_IMAGE_WIDTH, PDF_PAGE_SIZE[0] - 2 * PDF_MARGIN)
+            blocks.append(f'<p><img src="{name}" width="{width:.0f}"/></p>')
+            blocks.append(f'<p class="caption">{html.escape(caption)}</p>')
+        except Exception as e:
+            error_msg = f"이미지 추가 오류: {str(e)}"
+            print(error_msg)
+    if not blocks:
+        return ""
+    return "<h2>관련 이미지</h2>\n" + "\n".join(blocks)
+
+
+def render_pdf_report(report_content, images, output_path):
+    """보고서를 PDF 파일로 렌더링 (페이지를 하나씩 임시 파일에 기록), 페이지 수 반환"""
+    import fitz  # PyMuPDF
+
+    page_rect = fitz.Rect(0, 0, *PDF_PAGE_SIZE)
+    content_rect = page_rect + (PDF_MARGIN, PDF_MARGIN, -PDF_MARGIN, -PDF_MARGIN)
+    archive = fitz.Archive()
+    body = markdown_to_html(report_content)
+    if images:
+        body += "\n" + _pdf_image_html(images, archive)
+    story = fitz.Story(html=body, user_css=PDF_CSS, archive=archive)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        draft_path = os.path.join(temp_dir, "draft.pdf")
+
+        # 1. 레이아웃: 한 페이지씩 배치 후 바로 기록 (완성된 페이지는 메모리에 쌓이지 않음)
+        links = []
+        page_count = 0
+
+        def record_link(position):
+            rect = fitz.Rect(position.rect)
+            if not position.href or not position.open_close & 1 or rect.is_empty:
+                return
+            # 같은 링크의 같은 줄 조각은 하나의 영역으로 합침
+            if links:
+                last_page, last_rect, last_url = links[-1]
+                if last_page == page_count - 1 and last_url == position.href and abs(last_rect.y0 - rect.y0) < 1:
+                    links[-1] = (last_page, last_rect | rect, last_url)
+                    return
+            links.append((page_count - 1, rect, position.href))
+
+        writer = fitz.DocumentWriter(draft_path)
+        more = True
+        while more:
+            device = writer.begin_page(page_rect)
+            page_count += 1
+            more, _filled = story.place(content_rect)
+            story.element_positions(record_link, {})
+            story.draw(device)
+            writer.end_page()
+        writer.close()
+
+        # 2. 후처리: 링크 주석, 쪽 번호, 폰트 서브셋 후 압축 저장
+        doc = fitz.open(draft_path)
+        try:
+            for page_index, rect, url in links:
+                doc[page_index].insert_link({"kind": fitz.LINK_URI, "from": rect, "uri": url})
+            for page in doc:
+                page.insert_text((page_rect.width / 2 - 10, page_rect.height - PDF_MARGIN / 2),
+                                 f"{page.number + 1} / {page_count}", fontsize=8, color=(0.4, 0.4, 0.4))
+            if PDF_SUBSET_FONTS:
+                doc.subset_fonts()
+            doc.save(output_path, garbage=3, deflate=True)
+        finally:
+            doc.close()
+
+    metrics.record(pages=page_count)
+    return page_count
+
+
+def create_pdf_report(report_content, images=None):
+    """PDF 형식 보고서 생성 (PyMuPDF 레이아웃, 한글/링크/이미지 포함)"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "report.pdf")
+        render_pdf_report(report_content, images, output_path)
+        with open(output_path, "rb") as f:
+            data = f.read()
+    metrics.record(bytes_out=len(data))
+    return data
+
+
+ARTIFACT_BUILDERS = {
+    "docx": create_docx_report,
+    "pdf": create_pdf_report
+}
+
+
+def artifact_key(kind, report_content, images=None):
+    """보고서 내용과 이미지 구성으로 산출물 캐시 키 생성"""
+    digest = hashlib.sha256(report_content.encode("utf-8"))
+    for img_url, caption in images or []:
+        digest.update(f"\n{image_identity(img_url)}|{caption}".encode("utf-8"))
+    return f"{kind}:{digest.hexdigest()}"
+
+
+def get_artifact(kind, report_content, images=None, build=True):
+    """산출물 조회 (캐시에 없고 build=True면 생성 후 캐시, build=False면 None)"""
+    key = artifact_key(kind, report_content, images)
+    store = get_artifact_store()
+    handle = artifact_cache.get(key)
+    data = store.get(handle) if handle else None
+    if data is None and build:
+        data = ARTIFACT_BUILDERS[kind](report_content, images)
+        artifact_cache.set(key, store.put(data))
+    return data
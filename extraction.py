@@ -0,0 +1,387 @@
+import os
+import re
+import math
+import zipfile
+import posixpath
+from collections import Counter
+from xml.etree import ElementTree
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from images import describe_page_images, DOCX_MEDIA_FORMATS
+from ingest import DocumentSource, open_pdf, open_binary
+
+# ----- PDF 텍스트 추출 방식 -----
+
+# blocks: 블록 단위 추출 + 반복 머리글/바닥글/쪽 번호 제거 + 줄 병합, plain: 페이지 전체 get_text()
+PDF_TEXT_MODE = os.getenv("PDF_TEXT_MODE", "blocks")
+
+# 추출 결과 형식이 바뀌면 올려서 기존 추출 캐시를 무효화 (추출 방식별로 따로 캐시)
+EXTRACTOR_VERSION = f"4-{PDF_TEXT_MODE}"
+
+# 페이지 위/아래 이 비율 안에 있는 블록만 머리글/바닥글 후보로 봄
+BOILERPLATE_MARGIN = 0.08
+
+# 이 비율(최소 BOILERPLATE_MIN_PAGES쪽) 이상의 페이지에 반복되면 머리글/바닥글로 제거
+BOILERPLATE_MIN_RATIO = 0.5
+BOILERPLATE_MIN_PAGES = 3
+
+# 쪽 번호 형태 ("3", "- 3 -", "3 / 10", "Page 3 of 10", "3쪽")
+# 연도/각주 번호/표 셀도 같은 형태이므로 같은 여백에 BOILERPLATE_MIN_RATIO 이상 반복될 때만 제거
+PAGE_NUMBER_PATTERN = re.compile(
+    r"(page|p\.)?\s*[-–—(\[]?\s*\d{1,4}\s*[-–—)\]]?\s*((/|of)\s*\d{1,4})?\s*(쪽|페이지)?", re.IGNORECASE)
+
+# 줄 병합 시 새 줄로 유지할 목록 표시
+LIST_ITEM_PATTERN = re.compile(r"([•·▪◦●○■□\-–*]|\d{1,3}[.)]|[가-하][.)])\s")
+
+# ----- PDF 병렬 추출 설정 -----
+
+# 이 페이지 수 미만의 PDF는 프로세스 풀 없이 직렬로 처리
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+
+# 워커 수 (0 또는 미설정이면 CPU 코어 수 사용)
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0"))
+
+# 샤드 하나에 들어가는 최소 페이지 수 (너무 잘게 쪼개면 문서 열기 비용이 커짐)
+MIN_SHARD_PAGES = 8
+
+
+def resolve_workers(workers=None):
+    """사용할 워커 수 결정"""
+    if workers is None:
+        workers = PDF_EXTRACT_WORKERS
+    if not workers or workers < 1:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def split_page_ranges(page_count, workers):
+    """페이지 범위를 (start, stop) 샤드 목록으로 분할"""
+    if page_count <= 0:
+        return []
+
+    # 워커당 여러 샤드를 배정해 페이지별 처리 시간 편차를 흡수
+    shard_count = max(1, min(workers * 4, page_count // MIN_SHARD_PAGES))
+    base_size, remainder = divmod(page_count, shard_count)
+
+    ranges = []
+    start = 0
+    for shard_index in range(shard_count):
+        stop = start + base_size + (1 if shard_index < remainder else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def merge_block_lines(text):
+    """블록 안에서 줄바꿈으로 나뉜 문장을 한 줄로 병합 (목록 항목은 줄 유지)"""
+    merged = []
+    for line in text.split("\n"):
+        line = " ".join(line.split())
+        if not line:
+            continue
+        if merged and not LIST_ITEM_PATTERN.match(line):
+            merged[-1] = f"{merged[-1]} {line}"
+        else:
+            merged.append(line)
+    return "\n".join(merged)
+
+
+def pdf_block_flags():
+    """블록 추출 플래그 (줄 끝 하이픈으로 나뉜 단어 병합)"""
+    import fitz  # PyMuPDF
+
+    return fitz.TEXTFLAGS_BLOCKS | fitz.TEXT_DEHYPHENATE
+
+
+def page_blocks(page):
+    """페이지의 텍스트 블록을 읽기 순서대로 위치 정보(쪽 높이 대비 위/아래 비율)와 함께 반환"""
+    height = page.rect.height or 1
+    blocks = []
+    for x0, y0, x1, y1, text, _block_no, block_type in page.get_text("blocks", flags=pdf_block_flags()):
+        if block_type != 0:
+            continue
+        text = merge_block_lines(text)
+        if text:
+            blocks.append({
+                "text": text,
+                "bbox": [round(x0, 1), round(y0, 1), round(x1, 1), round(y1, 1)],
+                "top": round(y0 / height, 4),
+                "bottom": round(y1 / height, 4)
+            })
+    return blocks
+
+
+def iter_page_range(source, start, stop, text_mode=None):
+    """문서를 독립적으로 열어 [start, stop) 페이지의 텍스트와 이미지 메타데이터를 순서대로 생성"""
+    if text_mode is None:
+        text_mode = PDF_TEXT_MODE
+    digests = {}
+
+    pdf_document = open_pdf(source)
+    try:
+        for page_num in range(start, stop):
+            page = pdf_document[page_num]
+
+            # 텍스트 추출 (blocks 모드는 블록을 빈 줄로 구분해 청크 경계가 블록 경계와 맞도록 함)
+            if text_mode == "blocks":
+                blocks = page_blocks(page)
+                text = "\n\n".join(block["text"] for block in blocks)
+            else:
+                blocks = None
+                text = page.get_text()
+
+            # 이미지는 디코딩하지 않고 메타데이터만 기록 (실제 디코딩은 ImageRef.load)
+            images = describe_page_images(pdf_document, page, digests)
+
+            yield {
+                "page": page_num,
+                "text": text,
+                "blocks": blocks,
+                "images": images
+            }
+    finally:
+        pdf_document.close()
+
+
+def boilerplate_key(text):
+    """반복 판별용 정규화 (숫자는 쪽 번호/날짜가 달라도 같게 보도록 치환)"""
+    return re.sub(r"\d+", "#", " ".join(text.split()).casefold())
+
+
+def margin_edge(block, margin=None):
+    """블록이 페이지 위 여백이면 "top", 아래 여백이면 "bottom", 본문 영역이면 None"""
+    if margin is None:
+        margin = BOILERPLATE_MARGIN
+    center = (block["top"] + block["bottom"]) / 2
+    if center <= margin:
+        return "top"
+    if center >= 1 - margin:
+        return "bottom"
+    return None
+
+
+def margin_key(block):
+    """여백 블록의 반복 판별 키 (여백 위치 + 정규화 텍스트, 본문 블록은 None)"""
+    edge = margin_edge(block)
+    return (edge, boilerplate_key(block["text"])) if edge else None
+
+
+def strip_boilerplate(pages):
+    """여러 페이지 여백에 반복되는 머리글/바닥글과 쪽 번호 블록을 제거하고 페이지 텍스트 갱신, 제거한 블록 수 반환"""
+    block_pages = [page for page in pages if page.get("blocks") is not None]
+    if not block_pages:
+        return 0
+
+    # 페이지마다 한 번씩만 세어 같은 페이지 안의 반복은 제외 (위/아래 여백은 따로 셈)
+    repeats = Counter()
+    for page in block_pages:
+        repeats.update({key for key in map(margin_key, page["blocks"]) if key})
+    threshold = max(BOILERPLATE_MIN_PAGES, math.ceil(BOILERPLATE_MIN_RATIO * len(block_pages)))
+    # 쪽 번호 형태는 짧은 문서에서도 제거하도록 최소 쪽 수 없이 비율만 적용 (2쪽 이상)
+    page_number_threshold = max(2, math.ceil(BOILERPLATE_MIN_RATIO * len(block_pages)))
+
+    removed = 0
+    for page in block_pages:
+        kept = []
+        for block in page["blocks"]:
+            key = margin_key(block)
+            if key and (repeats[key] >= threshold
+                        or (repeats[key] >= page_number_threshold
+                            and PAGE_NUMBER_PATTERN.fullmatch(block["text"].strip()))):
+                removed += 1
+                continue
+            kept.append(block)
+        if len(kept) != len(page["blocks"]):
+            page["blocks"] = kept
+            page["text"] = "\n\n".join(block["text"] for block in kept)
+    return removed
+
+
+def extract_page_range(file_path, start, stop):
+    """프로세스 워커용: [start, stop) 페이지 결과를 리스트로 반환"""
+    return list(iter_page_range(file_path, start, stop))
+
+
+def iter_pdf_pages(source, workers=None, min_pages=None):
+    """PDF 페이지 결과를 페이지 순서대로 생성 (큰 문서는 샤드 단위 병렬 추출)"""
+    if min_pages is None:
+        min_pages = PARALLEL_MIN_PAGES
+    workers = resolve_workers(workers)
+
+    with open_pdf(source) as pdf_document:
+        page_count = len(pdf_document)
+
+    # 작은 파일이나 단일 워커는 직렬 처리
+    if workers <= 1 or page_count < min_pages:
+        yield from iter_page_range(source, 0, page_count)
+        return
+
+    shards = split_page_ranges(page_count, workers)
+
+    # 워커는 각자 문서를 열어야 하므로 파일 경로가 필요 (메모리 버퍼는 이때만 스풀)
+    file_path = source.ensure_path() if isinstance(source, DocumentSource) else source
+
+    next_page = 0
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+            futures = [executor.submit(extract_page_range, file_path, start, stop)
+                       for start, stop in shards]
+
+            # 샤드 제출 순서 = 페이지 순서이므로 완료되는 대로 순서대로 내보냄
+            for future in futures:
+                for page in future.result():
+                    yield page
+                    next_page = page["page"] + 1
+    except (BrokenProcessPool, OSError) as e:
+        # 프로세스 생성이 불가능한 환경에서는 남은 페이지를 직렬로 처리
+        print(f"PDF 병렬 추출 실패, 직렬 처리로 전환: {str(e)}")
+        yield from iter_page_range(source, next_page, page_count)
+
+
+def extract_pdf_pages(source, workers=None, min_pages=None):
+    """PDF를 페이지 샤드 단위로 병렬 추출하여 페이지 순서대로 반환"""
+    return list(iter_pdf_pages(source, workers=workers, min_pages=min_pages))
+
+
+# ----- DOCX 추출 (zip 항목을 한 번씩만 스트리밍 파싱) -----
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+A_BLIP = "{http://schemas.openxmlformats.org/drawingml/2006/main}blip"
+WP_EXTENT = "{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}extent"
+WP_DOCPR = "{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}docPr"
+V_IMAGEDATA = "{urn:schemas-microsoft-com:vml}imagedata"
+PACKAGE_RELS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# 도형 크기 단위 (EMU) → 96dpi 픽셀
+EMU_PER_PIXEL = 9525
+
+# 표 셀 구분자 (한 행을 한 줄로 펼침)
+TABLE_CELL_SEPARATOR = " | "
+
+
+def _docx_paragraph(paragraph):
+    """w:p 요소의 텍스트와 이미지 참조(관계 ID, 설명, 표시 크기)"""
+    parts = []
+    images = []
+    extent = None
+    caption = None
+    for elem in paragraph.iter():
+        tag = elem.tag
+        if tag == W_NS + "t":
+            parts.append(elem.text or "")
+        elif tag == W_NS + "tab":
+            parts.append("\t")
+        elif tag in (W_NS + "br", W_NS + "cr"):
+            parts.append("\n")
+        elif tag == WP_EXTENT:
+            extent = (int(elem.get("cx", 0)) // EMU_PER_PIXEL, int(elem.get("cy", 0)) // EMU_PER_PIXEL)
+        elif tag == WP_DOCPR:
+            caption = elem.get("descr") or elem.get("title")
+        elif tag == A_BLIP or tag == V_IMAGEDATA:
+            rel_id = elem.get(R_NS + "embed") or elem.get(R_NS + "id")
+            if rel_id:
+                width, height = extent or (0, 0)
+                images.append({"rel_id": rel_id, "caption": caption, "width": width, "height": height})
+                extent = None
+                caption = None
+    return "".join(parts), images
+
+
+def iter_docx_part(xml_stream):
+    """document/header/footer XML을 스트리밍 파싱해 본문 순서대로 ("text", 문자열) 또는 ("image", 참조) 생성"""
+    # 표는 행마다 셀을 구분자로 이어 한 블록으로 내보내고, 처리한 요소는 바로 비워 메모리를 일정하게 유지
+    tables = []
+    for event, elem in ElementTree.iterparse(xml_stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == W_NS + "tbl":
+                tables.append([])
+            elif tag == W_NS + "tr" and tables:
+                tables[-1].append([])
+            elif tag == W_NS + "tc" and tables and tables[-1]:
+                tables[-1][-1].append([])
+            continue
+
+        if tag == W_NS + "p":
+            text, images = _docx_paragraph(elem)
+            elem.clear()
+            for image in images:
+                yield "image", image
+            if tables and tables[-1] and tables[-1][-1]:
+                # 표 안의 문단은 현재 셀에 모음
+                tables[-1][-1][-1].append(text.strip())
+            elif text.strip():
+                yield "text", text
+        elif tag == W_NS + "tbl" and tables:
+            rows = tables.pop()
+            lines = [TABLE_CELL_SEPARATOR.join(" ".join(filter(None, cell)) for cell in row) for row in rows]
+            table_text = "\n".join(line for line in lines if line.strip(TABLE_CELL_SEPARATOR + " "))
+            elem.clear()
+            if tables and tables[-1] and tables[-1][-1]:
+                # 중첩 표는 바깥 표의 셀 내용으로 포함
+                tables[-1][-1][-1].append(table_text)
+            elif table_text:
+                yield "text", table_text
+
+
+def _docx_relationships(archive, part, rel_type="image"):
+    """part의 관계 파일에서 rel_type 관계의 내부 대상 {관계 ID: zip 항목 이름} (part가 ""이면 패키지 관계)"""
+    directory, name = posixpath.split(part)
+    rels_part = posixpath.join(directory, "_rels", f"{name}.rels")
+    if rels_part not in archive.NameToInfo:
+        return {}
+
+    targets = {}
+    with archive.open(rels_part) as rels_stream:
+        for rel in ElementTree.parse(rels_stream).getroot().iter(PACKAGE_RELS_NS + "Relationship"):
+            if rel.get("TargetMode") == "External" or not rel.get("Type", "").endswith("/" + rel_type):
+                continue
+            target = rel.get("Target", "")
+            targets[rel.get("Id")] = posixpath.normpath(
+                target.lstrip("/") if target.startswith("/") else posixpath.join(directory, target))
+    return targets
+
+
+def extract_docx_parts(source):
+    """DOCX zip을 한 번 열어 본문(문단/표), 머리글/바닥글 텍스트, 본문 이미지 메타데이터 추출"""
+    # 이미지는 zip 항목 정보(CRC/크기)만 기록하고 바이트는 DocxImageRef.load에서 word/media를 직접 읽음
+    result = {"text_content": [], "header_footer": [], "images": []}
+
+    with open_binary(source) as docx_stream, zipfile.ZipFile(docx_stream) as archive:
+        # 본문 part 이름은 패키지 관계(_rels/.rels)의 officeDocument 대상 (word/document2.xml 등인 파일도 있음)
+        main_part = next(iter(_docx_relationships(archive, "", "officeDocument").values()), "word/document.xml")
+        targets = _docx_relationships(archive, main_part)
+        with archive.open(main_part) as xml_stream:
+            for kind, value in iter_docx_part(xml_stream):
+                if kind == "text":
+                    result["text_content"].append(value)
+                    continue
+                part = targets.get(value["rel_id"])
+                image_format = posixpath.splitext(part or "")[1].lstrip(".").lower()
+                if part not in archive.NameToInfo or image_format not in DOCX_MEDIA_FORMATS:
+                    continue
+                info = archive.NameToInfo[part]
+                result["images"].append({
+                    "part": part,
+                    "width": value["width"],
+                    "height": value["height"],
+                    "format": image_format,
+                    "digest": f"{info.CRC:08x}-{info.file_size}",
+                    "caption": value["caption"]
+                })
+
+        # 머리글/바닥글은 구역마다 같은 내용이 반복되므로 중복 제거 (로고 등 이미지는 제외)
+        seen = set()
+        header_footer_parts = set(_docx_relationships(archive, main_part, "header").values())
+        header_footer_parts.update(_docx_relationships(archive, main_part, "footer").values())
+        for part in sorted(header_footer_parts):
+            if part not in archive.NameToInfo:
+                continue
+            with archive.open(part) as xml_stream:
+                for kind, value in iter_docx_part(xml_stream):
+                    if kind == "text" and value.strip() not in seen:
+                        seen.add(value.strip())
+                        result["header_footer"].append(value)
+
+    return result
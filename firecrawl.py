@@ -0,0 +1,196 @@
+import os
+import time
+import threading
+from urllib.parse import urlparse
+from cache import TTLCache, RequestCoalescer
+import metrics
+
+# ----- Firecrawl API 클라이언트 -----
+
+FIRECRAWL_BASE_URL = os.getenv("FIRECRAWL_BASE_URL", "https://api.firecrawl.dev")
+
+# 연결/응답 대기 타임아웃 (초)
+FIRECRAWL_CONNECT_TIMEOUT = float(os.getenv("FIRECRAWL_CONNECT_TIMEOUT", "5"))
+FIRECRAWL_READ_TIMEOUT = float(os.getenv("FIRECRAWL_READ_TIMEOUT", "30"))
+
+# 검색 결과 캐시 유지 시간 (초)
+FIRECRAWL_CACHE_TTL = int(os.getenv("FIRECRAWL_CACHE_TTL", "3600"))
+
+# 같은 호스트로 보내는 요청 사이 최소 간격 (초)
+FIRECRAWL_MIN_INTERVAL = float(os.getenv("FIRECRAWL_MIN_INTERVAL", "0.2"))
+
+# 동일 질의 캐시와 진행 중 요청 합치기 (프로세스 공용)
+search_cache = TTLCache(ttl=FIRECRAWL_CACHE_TTL, max_entries=512)
+search_coalescer = RequestCoalescer()
+scrape_cache = TTLCache(ttl=FIRECRAWL_CACHE_TTL, max_entries=256)
+scrape_coalescer = RequestCoalescer()
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class FirecrawlError(Exception):
+    """Firecrawl API 오류 응답"""
+
+    def __init__(self, status_code, text):
+        super().__init__(f"{status_code}, {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+def get_session():
+    """연결 풀을 재사용하는 공용 requests 세션"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # 첫 검색 요청 시점에 로드 (앱 시작 시 import 비용 제외)
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def normalize_query(query):
+    """캐시 키용 질의 정규화 (공백 정리, 대소문자 무시)"""
+    return " ".join(query.split()).casefold()
+
+
+def normalize_domains(domains):
+    """캐시 키용 도메인 필터 정규화 (쉼표 구분 문자열 또는 목록)"""
+    if not domains:
+        return ()
+    if isinstance(domains, str):
+        domains = domains.split(",")
+    return tuple(sorted({d.strip().lower() for d in domains if d.strip()}))
+
+
+class HostRateLimiter:
+    """호스트별 최소 요청 간격을 보장하는 간단한 속도 제한기"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next_allowed = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        """이 호스트에 요청을 보낼 수 있을 때까지 대기"""
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            allowed = max(now, self._next_allowed.get(host, 0.0))
+            self._next_allowed[host] = allowed + self.min_interval
+        if allowed > now:
+            time.sleep(allowed - now)
+
+
+rate_limiter = HostRateLimiter(FIRECRAWL_MIN_INTERVAL)
+
+
+def _post(path, api_key, payload):
+    """Firecrawl API POST 호출 (공용 세션, 타임아웃, 호스트별 속도 제한)"""
+    url = f"{FIRECRAWL_BASE_URL}{path}"
+    rate_limiter.wait(url)
+
+    response = get_session().post(
+        url,
+        headers={
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        },
+        json=payload,
+        timeout=(FIRECRAWL_CONNECT_TIMEOUT, FIRECRAWL_READ_TIMEOUT)
+    )
+    metrics.record(requests=1, bytes_out=len(response.request.body or b""), bytes_in=len(response.content))
+    if response.status_code != 200:
+        raise FirecrawlError(response.status_code, response.text)
+    return response.json()
+
+
+def search(query, api_key, domains=None, use_cache=True):
+    """Firecrawl 검색 (TTL 캐시 + 동시 동일 요청 합치기). (응답 JSON, 캐시 적중 여부) 반환"""
+    query = query.strip()
+    cache_key = (normalize_query(query), normalize_domains(domains))
+
+    if use_cache:
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            metrics.record(cache_hits=1)
+            return cached, True
+
+    # v1 API는 'query' 외 필드를 받지 않으므로 domains는 캐시 키에만 반영
+    payload = {"query": query}
+
+    def fetch():
+        result_data = _post("/v1/search", api_key, payload)
+        search_cache.set(cache_key, result_data)
+        return result_data
+
+    return search_coalescer.run(cache_key, fetch), False
+
+
+def scrape(url, api_key, use_cache=True):
+    """Firecrawl로 페이지 본문(markdown) 수집 (TTL 캐시 + 동시 동일 요청 합치기)"""
+    if use_cache:
+        cached = scrape_cache.get(url)
+        if cached is not None:
+            metrics.record(cache_hits=1)
+            return cached
+
+    def fetch():
+        # 수집 대상 사이트에도 호스트별 간격 적용
+        rate_limiter.wait(url)
+        result_data = _post("/v1/scrape", api_key, {"url": url, "formats": ["markdown"]})
+        content = result_data.get("data", {}).get("markdown", "")
+        scrape_cache.set(url, content)
+        return content
+
+    return scrape_coalescer.run(url, fetch)
+
+
+def format_search_results(result_data):
+    """검색 응답을 text_content/images/sources 구조로 변환"""
+    formatted_results = {
+        "text_content": [],
+        "images": [],
+        "sources": []
+    }
+
+    # 텍스트 컨텐츠 추출 (Firecrawl v1 API 응답 형식에 맞게 조정)
+    results = result_data.get("data", [])  # 'data' 필드 확인
+
+    if not results:
+        # 다른 가능한 필드들도 확인
+        results = result_data.get("results", [])
+
+        if not results and "organic" in result_data:
+            # v1 API에서는 'organic' 필드 아래에 결과가 있을 수 있음
+            results = result_data.get("organic", [])
+
+    for item in results:
+        # 스니펫 추출
+        if "snippet" in item:
+            formatted_results["text_content"].append(item["snippet"])
+
+        # 제목 추출 (v1 API에서는 다른 필드명일 수 있음)
+        if "title" in item:
+            formatted_results["text_content"].append(f"제목: {item['title']}")
+
+        # URL 추출
+        if "link" in item:  # v1 API에서는 'url' 대신 'link'일 수 있음
+            formatted_results["sources"].append(item["link"])
+        elif "url" in item:
+            formatted_results["sources"].append(item["url"])
+
+        # 이미지 추출
+        if "image" in item:  # v1 API에서는 'image_url' 대신 'image'일 수 있음
+            title = item.get("title", "이미지")
+            formatted_results["images"].append((item["image"], title))
+        elif "image_url" in item and "title" in item:
+            formatted_results["images"].append((item["image_url"], item["title"]))
+
+    return formatted_results, results
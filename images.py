@@ -0,0 +1,452 @@
+import io
+import os
+import base64
+import hashlib
+import zipfile
+from ingest import open_pdf, open_binary
+from concurrent.futures import ThreadPoolExecutor
+from cache import DirectoryCache, CACHE_DIR
+from artifacts import store_artifact, read_artifact, ArtifactExpiredError
+import metrics
+
+# ----- 이미지 인덱스 / 지연 디코딩 -----
+
+# DOCX와 브라우저에 그대로 넣을 수 있는 형식 (재인코딩 불필요)
+EMBEDDABLE_FORMATS = {"png": "image/png", "jpeg": "image/jpeg", "jpg": "image/jpeg", "gif": "image/gif", "bmp": "image/bmp"}
+
+# PDF 스트림 필터 → 추출 시 얻게 되는 이미지 형식
+FILTER_FORMATS = {
+    "DCTDecode": "jpeg",
+    "JPXDecode": "jpx",
+    "JBIG2Decode": "jb2",
+    "CCITTFaxDecode": "tiff",
+}
+
+# DOCX word/media 중 변환 가능한 형식 (EMF/WMF 등 벡터 형식은 렌더링할 수 없어 제외)
+DOCX_MEDIA_FORMATS = {"png", "jpeg", "jpg", "gif", "bmp", "tif", "tiff", "webp"}
+
+# ----- 원격 이미지 수집 / 정규화 설정 -----
+
+# 원격 이미지 다운로드 타임아웃 (초), 최대 크기, 로컬 캐시 크기 상한
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "10"))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_MB", "10")) * 1024 * 1024
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MB", "256")) * 1024 * 1024
+
+# 보고서 이미지 폭 (DOCX 5인치 기준)과 해상도 → 정규화 목표 픽셀 폭
+IMAGE_WIDTH_INCHES = 5
+IMAGE_DPI = int(os.getenv("IMAGE_DPI", "150"))
+IMAGE_TARGET_WIDTH = IMAGE_WIDTH_INCHES * IMAGE_DPI
+
+# 동시에 준비할 이미지 수
+IMAGE_FETCH_WORKERS = int(os.getenv("IMAGE_FETCH_WORKERS", "6"))
+
+_remote_image_cache = None
+
+
+class ImageTooLargeError(ValueError):
+    """이미지 크기 제한 초과"""
+
+
+class ImageRef:
+    """PDF 내 이미지에 대한 지연 참조 (메타데이터만 보관, 필요할 때 디코딩)"""
+
+    def __init__(self, source, xref, page, width, height, image_format, digest):
+        self.source = source
+        self.xref = xref
+        self.page = page
+        self.width = width
+        self.height = height
+        self.format = image_format
+        self.digest = digest
+        self.data = None
+        self.mime = None
+
+    def load(self):
+        """원본 바이트를 읽어 임베드 가능한 형식으로 준비 (한 번만 수행)"""
+        if self.data is not None:
+            return self
+
+        with open_pdf(self.source) as pdf_document:
+            base_image = pdf_document.extract_image(self.xref)
+
+        image_bytes = base_image["image"]
+        ext = base_image.get("ext", self.format).lower()
+
+        if ext in EMBEDDABLE_FORMATS:
+            # 이미 임베드 가능한 형식이면 원본 바이트 유지
+            self.data = image_bytes
+            self.mime = EMBEDDABLE_FORMATS[ext]
+        else:
+            # JPX, JBIG2 등은 PNG로 변환
+            self.data = convert_to_png(image_bytes)
+            self.mime = "image/png"
+        self.format = ext
+        return self
+
+    def to_data_uri(self):
+        """data: URI 문자열로 변환"""
+        self.load()
+        return f"data:{self.mime};base64,{base64.b64encode(self.data).decode('utf-8')}"
+
+    def __repr__(self):
+        return f"ImageRef(xref={self.xref}, page={self.page + 1}, {self.width}x{self.height}, {self.format})"
+
+
+class DocxImageRef:
+    """DOCX word/media 이미지에 대한 지연 참조 (zip 항목 이름만 보관, 필요할 때 읽음)"""
+
+    def __init__(self, source, part, width, height, image_format, digest):
+        self.source = source
+        self.part = part
+        self.width = width
+        self.height = height
+        self.format = image_format
+        self.digest = digest
+        self.data = None
+        self.mime = None
+
+    def load(self):
+        """zip 항목을 읽어 임베드 가능한 형식으로 준비 (한 번만 수행)"""
+        if self.data is not None:
+            return self
+
+        with open_binary(self.source) as docx_stream, zipfile.ZipFile(docx_stream) as archive:
+            image_bytes = archive.read(self.part)
+
+        if self.format in EMBEDDABLE_FORMATS:
+            self.data = image_bytes
+            self.mime = EMBEDDABLE_FORMATS[self.format]
+        else:
+            # TIFF, WebP 등은 PNG로 변환
+            self.data = convert_to_png(image_bytes)
+            self.mime = "image/png"
+        return self
+
+    def to_data_uri(self):
+        """data: URI 문자열로 변환"""
+        self.load()
+        return f"data:{self.mime};base64,{base64.b64encode(self.data).decode('utf-8')}"
+
+    def __repr__(self):
+        return f"DocxImageRef({self.part}, {self.width}x{self.height}, {self.format})"
+
+
+def convert_to_png(image_bytes):
+    """임베드할 수 없는 형식의 이미지를 PNG 바이트로 변환"""
+    # PIL/requests는 이미지를 실제로 다룰 때만 로드 (앱 시작 시 import 비용 제외)
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_bytes))
+    img_buffer = io.BytesIO()
+    image.save(img_buffer, format="PNG")
+    return img_buffer.getvalue()
+
+
+def stream_digest(pdf_document, xref):
+    """이미지 원시 스트림의 내용 해시 (디코딩 없이 중복 판별용)"""
+    return hashlib.sha1(pdf_document.xref_stream_raw(xref)).hexdigest()
+
+
+def describe_page_images(pdf_document, page, digests=None):
+    """페이지의 이미지를 디코딩 없이 메타데이터로만 기술"""
+    if digests is None:
+        digests = {}
+
+    images = []
+    for img in page.get_images(full=True):
+        xref, width, height = img[0], img[2], img[3]
+        stream_filter = img[8]
+
+        # 같은 문서 안에서 반복되는 xref는 한 번만 해시
+        if xref not in digests:
+            digests[xref] = stream_digest(pdf_document, xref)
+
+        images.append({
+            "xref": xref,
+            "width": width,
+            "height": height,
+            "format": FILTER_FORMATS.get(stream_filter, "png"),
+            "digest": digests[xref]
+        })
+    return images
+
+
+def index_pdf_images(source, pages):
+    """페이지별 이미지 메타데이터를 xref/내용 해시로 중복 제거해 ImageRef 목록 생성"""
+    index = []
+    seen = set()
+
+    for page in pages:
+        for img_index, meta in enumerate(page["images"]):
+            # 같은 xref(로고, 머리글 등)나 같은 내용은 처음 나온 것만 사용
+            if meta["xref"] in seen or meta["digest"] in seen:
+                continue
+            seen.add(meta["xref"])
+            seen.add(meta["digest"])
+
+            ref = ImageRef(source, meta["xref"], page["page"], meta["width"],
+                           meta["height"], meta["format"], meta["digest"])
+            index.append((ref, f"이미지 {page['page']+1}-{img_index+1}"))
+
+    return index
+
+
+def index_docx_images(source, images):
+    """DOCX 본문 순서의 이미지 메타데이터를 내용(CRC/크기) 기준으로 중복 제거해 DocxImageRef 목록 생성"""
+    index = []
+    seen = set()
+
+    for img_index, meta in enumerate(images):
+        # 같은 이미지를 여러 번 배치하거나 같은 파일을 다른 이름으로 넣은 경우 처음 것만 사용
+        if meta["part"] in seen or meta["digest"] in seen:
+            continue
+        seen.add(meta["part"])
+        seen.add(meta["digest"])
+
+        ref = DocxImageRef(source, meta["part"], meta["width"], meta["height"], meta["format"], meta["digest"])
+        index.append((ref, meta["caption"] or f"이미지 {img_index + 1}"))
+
+    return index
+
+
+def image_to_record(source, caption):
+    """캐시 저장용 직렬화 (문서 이미지는 메타데이터만, 준비된 이미지는 산출물 저장소 핸들, 나머지는 그대로)"""
+    if isinstance(source, (PreparedImage, StoredImage)):
+        handle = source.handle if isinstance(source, StoredImage) else store_artifact(source.data)
+        return {
+            "handle": handle,
+            "mime": source.mime,
+            "width": source.width,
+            "height": source.height,
+            "origin": source.origin,
+            "caption": caption
+        }
+    if isinstance(source, ImageRef):
+        return {
+            "xref": source.xref,
+            "page": source.page,
+            "width": source.width,
+            "height": source.height,
+            "format": source.format,
+            "digest": source.digest,
+            "caption": caption
+        }
+    if isinstance(source, DocxImageRef):
+        return {
+            "part": source.part,
+            "width": source.width,
+            "height": source.height,
+            "format": source.format,
+            "digest": source.digest,
+            "caption": caption
+        }
+    return {"url": source, "caption": caption}
+
+
+def image_from_record(document, record):
+    """캐시 레코드를 현재 문서에 연결된 이미지 항목으로 복원"""
+    if "url" in record:
+        return (record["url"], record["caption"])
+    if "handle" in record:
+        stored = StoredImage(record["handle"], record["mime"], record["width"], record["height"], record["origin"])
+        return (stored, record["caption"])
+    if "data" in record:
+        # 산출물 저장소 도입 전 작업 결과 (Base64 바이트)
+        prepared = PreparedImage(base64.b64decode(record["data"]), record["mime"],
+                                 record["width"], record["height"], record["origin"])
+        return (prepared, record["caption"])
+    if "part" in record:
+        ref = DocxImageRef(document, record["part"], record["width"], record["height"],
+                           record["format"], record["digest"])
+        return (ref, record["caption"])
+    ref = ImageRef(document, record["xref"], record["page"], record["width"],
+                   record["height"], record["format"], record["digest"])
+    return (ref, record["caption"])
+
+
+class PreparedImage:
+    """보고서용으로 검증/축소가 끝난 이미지 (미리보기와 DOCX가 같은 바이트를 사용)"""
+
+    def __init__(self, data, mime, width, height, origin):
+        self.data = data
+        self.mime = mime
+        self.width = width
+        self.height = height
+        self.origin = origin
+
+    def __repr__(self):
+        return f"PreparedImage({self.origin}, {self.width}x{self.height}, {len(self.data)} bytes)"
+
+
+class StoredImage:
+    """산출물 저장소에 보관된 준비된 이미지 (세션 상태/작업 결과에는 핸들과 메타데이터만 보관)"""
+
+    def __init__(self, handle, mime, width, height, origin):
+        self.handle = handle
+        self.mime = mime
+        self.width = width
+        self.height = height
+        self.origin = origin
+
+    def load(self, session_id=None):
+        """저장소에서 바이트를 읽어 PreparedImage로 반환 (세션 메모리 예산 안에서 재사용)"""
+        data = read_artifact(self.handle, session_id)
+        if data is None:
+            raise ArtifactExpiredError(f"이미지 보관 기간이 지났습니다: {self.origin}")
+        return PreparedImage(data, self.mime, self.width, self.height, self.origin)
+
+    def __repr__(self):
+        return f"StoredImage({self.origin}, {self.width}x{self.height}, {self.handle[:12]})"
+
+
+def get_remote_image_cache():
+    """원격/정규화 이미지 로컬 캐시 (프로세스 공용)"""
+    global _remote_image_cache
+    if _remote_image_cache is None:
+        _remote_image_cache = DirectoryCache(os.path.join(CACHE_DIR, "images"), IMAGE_CACHE_MAX_BYTES)
+    return _remote_image_cache
+
+
+def fetch_remote_image(url, max_bytes=None):
+    """원격 이미지를 크기 제한 안에서 한 번만 다운로드하여 로컬 캐시에 보관"""
+    if max_bytes is None:
+        max_bytes = IMAGE_MAX_BYTES
+
+    image_cache = get_remote_image_cache()
+    data = image_cache.get(url)
+    if data is not None:
+        metrics.record(cache_hits=1)
+        return data
+
+    import requests
+
+    with requests.get(url, timeout=IMAGE_FETCH_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+
+        # 헤더로 먼저 거르고, 실제 수신량도 확인 (Content-Length가 없거나 틀린 경우)
+        declared = int(response.headers.get("Content-Length") or 0)
+        if declared > max_bytes:
+            raise ImageTooLargeError(f"이미지가 너무 큽니다: {declared} bytes ({url})")
+
+        buffer = io.BytesIO()
+        for chunk in response.iter_content(64 * 1024):
+            buffer.write(chunk)
+            if buffer.tell() > max_bytes:
+                raise ImageTooLargeError(f"이미지가 너무 큽니다: {max_bytes} bytes 초과 ({url})")
+        data = buffer.getvalue()
+
+    metrics.record(requests=1, bytes_in=len(data))
+    image_cache.put(url, data)
+    return data
+
+
+def normalize_image(data, target_width=None):
+    """PIL로 검증하고 목표 폭보다 크면 한 번만 축소. (바이트, MIME, 폭, 높이) 반환"""
+    if target_width is None:
+        target_width = IMAGE_TARGET_WIDTH
+    from PIL import Image
+
+    # 손상 여부 검증 (verify 후에는 다시 열어야 함)
+    Image.open(io.BytesIO(data)).verify()
+    image = Image.open(io.BytesIO(data))
+
+    if image.width <= target_width and image.format in ("PNG", "JPEG"):
+        # 이미 충분히 작고 임베드 가능한 형식이면 원본 유지
+        return data, Image.MIME[image.format], image.width, image.height
+
+    if image.width > target_width:
+        height = max(1, round(image.height * target_width / image.width))
+        image.thumbnail((target_width, height), Image.LANCZOS)
+
+    # 투명도가 있으면 PNG, 아니면 JPEG로 재인코딩
+    buffer = io.BytesIO()
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image.save(buffer, format="PNG", optimize=True)
+        mime = "image/png"
+    else:
+        image.convert("RGB").save(buffer, format="JPEG", quality=85, optimize=True)
+        mime = "image/jpeg"
+    return buffer.getvalue(), mime, image.width, image.height
+
+
+def prepare_image(source, target_width=None):
+    """이미지 항목 1개를 가져와 정규화 (정규화 결과도 로컬 캐시에 보관)"""
+    if target_width is None:
+        target_width = IMAGE_TARGET_WIDTH
+    if isinstance(source, PreparedImage):
+        return source
+    if isinstance(source, StoredImage):
+        return source.load()
+
+    origin = image_identity(source)
+    cache_key = f"normalized:{target_width}:{origin}"
+    image_cache = get_remote_image_cache()
+
+    data = image_cache.get(cache_key)
+    if data is not None:
+        metrics.record(cache_hits=1, bytes_out=len(data))
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(data))
+        return PreparedImage(data, Image.MIME[image.format], image.width, image.height, origin)
+
+    data, mime, width, height = normalize_image(image_bytes(source), target_width)
+    metrics.record(bytes_out=len(data))
+    image_cache.put(cache_key, data)
+    return PreparedImage(data, mime, width, height, origin)
+
+
+def prepare_images(images, limit=3, target_width=None, max_workers=None):
+    """후보 이미지를 동시에 가져와 검증/축소하고 성공한 순서대로 최대 limit개 반환"""
+    if max_workers is None:
+        max_workers = IMAGE_FETCH_WORKERS
+
+    # 일부 후보가 실패해도 limit개를 채울 수 있도록 여유 있게 시도
+    candidates = images[:limit * 2]
+    if not candidates:
+        return []
+
+    def run(item):
+        source, caption = item
+        try:
+            return prepare_image(source, target_width), caption
+        except Exception as e:
+            print(f"이미지 준비 오류: {str(e)}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(candidates))) as executor:
+        prepared = [item for item in executor.map(metrics.bind(run), candidates) if item is not None]
+    return prepared[:limit]
+
+
+def image_identity(source):
+    """이미지 항목의 식별자 (캐시 키용)"""
+    if isinstance(source, (PreparedImage, StoredImage)):
+        return source.origin
+    if isinstance(source, ImageRef):
+        return f"pdf:{source.digest}"
+    if isinstance(source, DocxImageRef):
+        return f"docx:{source.digest}"
+    if source.startswith('data:image'):
+        return f"data:{hashlib.sha256(source.encode('utf-8')).hexdigest()}"
+    return f"url:{source}"
+
+
+def image_display_source(source, session_id=None):
+    """st.image에 넘길 값 (URL 문자열 또는 바이트, 저장소 이미지는 세션 메모리 예산으로 조회)"""
+    if isinstance(source, StoredImage):
+        return source.load(session_id).data
+    if isinstance(source, (ImageRef, DocxImageRef, PreparedImage)):
+        return image_bytes(source)
+    return source
+
+
+def image_bytes(source):
+    """DOCX 삽입용 이미지 바이트 (원격 URL은 로컬 캐시를 거쳐 다운로드)"""
+    if isinstance(source, PreparedImage):
+        return source.data
+    if isinstance(source, (ImageRef, DocxImageRef, StoredImage)):
+        return source.load().data
+    if source.startswith('data:image'):
+        return base64.b64decode(source.split(',')[1])
+    return fetch_remote_image(source)
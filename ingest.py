@@ -0,0 +1,161 @@
+import os
+import io
+import shutil
+import hashlib
+import tempfile
+
+# ----- 업로드 수집 설정 -----
+
+# 업로드 1건당 허용하는 최대 크기
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "200")) * 1024 * 1024
+
+# 이 크기 이하의 업로드는 메모리 버퍼에서 바로 열고, 넘으면 디스크로 스풀
+IN_MEMORY_MAX_BYTES = int(os.getenv("UPLOAD_IN_MEMORY_MB", "32")) * 1024 * 1024
+
+# 디스크 스풀 시 청크 크기
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """업로드 크기 제한 초과"""
+
+
+class DocumentSource:
+    """업로드 문서 접근 핸들 (메모리 버퍼 또는 임시 스풀 파일, close 시 정리)"""
+
+    def __init__(self, name, data=None, path=None, temp_dir=None):
+        self.name = name
+        self.data = data
+        self.path = path
+        self._temp_dir = temp_dir
+        self._sha256 = None
+
+    @property
+    def suffix(self):
+        return os.path.splitext(self.name)[1].lower()
+
+    @property
+    def size(self):
+        if self.data is not None:
+            return len(self.data)
+        return os.path.getsize(self.path)
+
+    def open_pdf(self):
+        """PyMuPDF 문서 열기 (메모리 버퍼는 복사 없이 사용)"""
+        # PyMuPDF는 PDF를 처음 열 때 로드 (업로드 검사만 하는 앱 시작 경로에서는 불필요)
+        import fitz  # PyMuPDF
+
+        if self.path:
+            return fitz.open(self.path)
+        return fitz.open(stream=self.data, filetype="pdf")
+
+    def open_binary(self):
+        """바이너리 파일 객체 열기 (python-docx, zipfile 등에서 사용)"""
+        if self.path:
+            return open(self.path, "rb")
+        return io.BytesIO(self.data)
+
+    def sha256(self):
+        """문서 내용의 SHA-256 (청크 단위로 계산, 한 번만 수행)"""
+        if self._sha256 is None:
+            digest = hashlib.sha256()
+            if self.data is not None:
+                digest.update(self.data)
+            else:
+                with open(self.path, "rb") as f:
+                    for chunk in iter(lambda: f.read(SPOOL_CHUNK_BYTES), b""):
+                        digest.update(chunk)
+            self._sha256 = digest.hexdigest()
+        return self._sha256
+
+    def ensure_path(self):
+        """파일 경로가 필요한 경우(프로세스 워커 등) 디스크로 스풀 후 경로 반환"""
+        if self.path is None:
+            self._temp_dir = tempfile.mkdtemp(prefix="upload_")
+            self.path = os.path.join(self._temp_dir, f"document{self.suffix}")
+            with open(self.path, "wb") as f:
+                f.write(self.data)
+        return self.path
+
+    def close(self):
+        """임시 파일과 버퍼 참조 정리"""
+        if self._temp_dir:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
+            self.path = None
+        self.data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        where = self.path or "memory"
+        return f"DocumentSource({self.name!r}, {where})"
+
+
+def check_upload_size(size, max_bytes=None):
+    """업로드 크기 제한 확인"""
+    if max_bytes is None:
+        max_bytes = MAX_UPLOAD_BYTES
+    if size > max_bytes:
+        raise UploadTooLargeError(
+            f"업로드 파일이 너무 큽니다: {size / 1024 / 1024:.1f}MB (최대 {max_bytes / 1024 / 1024:.0f}MB)"
+        )
+
+
+def open_upload(uploaded_file, max_bytes=None, in_memory_max_bytes=None, spool_dir=None):
+    """Streamlit 업로드 파일을 DocumentSource로 변환 (spool_dir: 큰 파일을 스풀할 상위 디렉터리)"""
+    if in_memory_max_bytes is None:
+        in_memory_max_bytes = IN_MEMORY_MAX_BYTES
+
+    size = uploaded_file.size
+    check_upload_size(size, max_bytes)
+
+    if size <= in_memory_max_bytes:
+        # 업로드 버퍼를 그대로 참조 (BytesIO.getvalue는 추가 복사 없이 공유)
+        return DocumentSource(uploaded_file.name, data=uploaded_file.getvalue())
+
+    # 큰 파일은 청크 단위로 디스크에 스풀하여 메모리 사용량을 제한
+    temp_dir = tempfile.mkdtemp(prefix="upload_", dir=spool_dir)
+    path = os.path.join(temp_dir, f"document{os.path.splitext(uploaded_file.name)[1].lower()}")
+    try:
+        uploaded_file.seek(0)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(uploaded_file, f, SPOOL_CHUNK_BYTES)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    return DocumentSource(uploaded_file.name, path=path, temp_dir=temp_dir)
+
+
+def open_path(file_path, max_bytes=None):
+    """로컬 파일 경로를 DocumentSource로 변환 (파일은 삭제하지 않음)"""
+    check_upload_size(os.path.getsize(file_path), max_bytes)
+    return DocumentSource(os.path.basename(file_path), path=file_path)
+
+
+def open_document(document):
+    """작업 파라미터의 문서 (이미 연 DocumentSource 또는 로컬 파일 경로)를 DocumentSource로 반환"""
+    if isinstance(document, DocumentSource):
+        return document
+    return open_path(document)
+
+
+def open_pdf(source):
+    """경로 문자열 또는 DocumentSource에서 PyMuPDF 문서 열기"""
+    if isinstance(source, DocumentSource):
+        return source.open_pdf()
+    import fitz  # PyMuPDF
+
+    return fitz.open(source)
+
+
+def open_binary(source):
+    """경로 문자열 또는 DocumentSource에서 바이너리 파일 객체 열기"""
+    if isinstance(source, DocumentSource):
+        return source.open_binary()
+    return open(source, "rb")
@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import uuid
+import zlib
+import shutil
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from cache import CACHE_DIR
+from ingest import open_upload
+from pipeline import Reporter
+
+# ----- 백그라운드 작업 큐 설정 -----
+
+# 프로세스당 동시에 실행할 작업 수 (나머지는 대기)
+JOB_MAX_CONCURRENCY = int(os.getenv("JOB_MAX_CONCURRENCY", "2"))
+
+# 프로세스당 대기/실행 중 작업 수 상한 (넘으면 제출 거부)
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "20"))
+
+# 끝난 작업 기록 보관 시간
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_HOURS", "24")) * 3600
+
+# UI 상태 확인 간격 (초)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+
+# 스트리밍 중간 결과 저장 최소 간격 (초)
+JOB_PARTIAL_INTERVAL = 0.5
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+
+class JobQueueFullError(RuntimeError):
+    """대기 중인 작업이 너무 많음"""
+
+
+class JobHandle(Reporter):
+    """작업 함수에 전달되는 Reporter (메시지/진행률/중간 결과를 작업 DB에 기록)"""
+
+    def __init__(self, queue, job_id):
+        super().__init__()
+        self.queue = queue
+        self.job_id = job_id
+        self._last_partial = 0.0
+
+    def message(self, level, text):
+        super().message(level, text)
+        self.queue._update(self.job_id, messages=json.dumps(self.messages, ensure_ascii=False))
+
+    def progress(self, value, stage=None):
+        # 진행률이 바뀔 때마다 완료된 단계 span도 함께 기록
+        fields = {"progress": value, "trace": json.dumps(self.trace.summary(), ensure_ascii=False)}
+        if stage:
+            fields["stage"] = stage
+        self.queue._update(self.job_id, **fields)
+
+    def partial(self, text):
+        now = time.monotonic()
+        if now - self._last_partial >= JOB_PARTIAL_INTERVAL:
+            self._last_partial = now
+            self.queue._update(self.job_id, partial=text)
+
+
+class JobQueue:
+    """SQLite에 상태/결과를 기록하는 스레드 풀 작업 큐 (재실행/재접속 후에도 작업 ID로 조회)"""
+
+    def __init__(self, path=None, max_workers=None, max_pending=None):
+        if path is None:
+            path = os.path.join(CACHE_DIR, "jobs.sqlite")
+        if max_workers is None:
+            max_workers = JOB_MAX_CONCURRENCY
+        if max_pending is None:
+            max_pending = JOB_MAX_PENDING
+
+        self.path = path
+        self.files_dir = os.path.join(os.path.dirname(path), "job_files")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report-job")
+
+        os.makedirs(self.files_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, params TEXT NOT NULL, "
+                "progress REAL NOT NULL DEFAULT 0, stage TEXT, messages TEXT, partial TEXT, "
+                "result BLOB, error TEXT, owner_pid INTEGER NOT NULL, "
+                "created REAL NOT NULL, started REAL, finished REAL, trace TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+            # 이전 버전에서 만든 DB에는 trace 열이 없음
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "trace" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN trace TEXT")
+
+        self._recover()
+        self.purge()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _update(self, job_id, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def _recover(self):
+        """종료된 프로세스가 남긴 미완료 작업을 실패로 표시"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, owner_pid FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES
+            ).fetchall()
+            for job_id, owner_pid in rows:
+                if owner_pid == os.getpid() or _pid_alive(owner_pid):
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?",
+                    (FAILED, "서버 재시작으로 작업이 중단되었습니다.", time.time(), job_id)
+                )
+                shutil.rmtree(os.path.join(self.files_dir, job_id), ignore_errors=True)
+
+    def submit(self, kind, func, params, files=None):
+        """작업 제출 후 작업 ID 반환. files: {params 키: 업로드 파일} - 해당 키에 DocumentSource를 넣어 실행"""
+        with self._lock:
+            if self.pending_count() >= self.max_pending:
+                raise JobQueueFullError(
+                    f"대기 중인 작업이 너무 많습니다 (최대 {self.max_pending}건). 잠시 후 다시 시도하세요."
+                )
+
+            job_id = uuid.uuid4().hex
+            params = dict(params)
+            sources = {}
+            job_dir = os.path.join(self.files_dir, job_id)
+            try:
+                if files:
+                    os.makedirs(job_dir, exist_ok=True)
+                    for key, file_obj in files.items():
+                        # 작업은 같은 프로세스의 스레드에서 실행되므로 작은 업로드는 메모리 버퍼를 그대로 넘기고,
+                        # 큰 업로드만 작업 디렉터리로 스풀 (DB에는 스풀 경로만 기록, 메모리 버퍼는 None)
+                        sources[key] = open_upload(file_obj, spool_dir=job_dir)
+                        params[key] = sources[key].path
+
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT INTO jobs (id, kind, status, params, owner_pid, created) VALUES (?, ?, ?, ?, ?, ?)",
+                        (job_id, kind, QUEUED, json.dumps(params, ensure_ascii=False), os.getpid(), time.time())
+                    )
+            except Exception:
+                # 작업 행이 없으면 _recover도 정리하지 않으므로 이미 연 업로드와 작업 디렉터리를 여기서 제거
+                for source in sources.values():
+                    source.close()
+                shutil.rmtree(job_dir, ignore_errors=True)
+                raise
+
+        self._executor.submit(self._run, job_id, func, dict(params, **sources), sources)
+        return job_id
+
+    def _run(self, job_id, func, params, sources=None):
+        self._update(job_id, status=RUNNING, started=time.time())
+        handle = JobHandle(self, job_id)
+        try:
+            result = func(params, handle)
+            payload = zlib.compress(json.dumps(result, ensure_ascii=False).encode("utf-8"))
+            self._update(job_id, status=DONE, progress=1.0, result=payload, partial=None, finished=time.time(),
+                         trace=json.dumps(handle.trace.summary(), ensure_ascii=False))
+        except Exception as e:
+            error_msg = f"작업 실행 오류: {str(e)}"
+            print(error_msg)
+            self._update(job_id, status=FAILED, error=str(e), partial=None, finished=time.time(),
+                         trace=json.dumps(handle.trace.summary(), ensure_ascii=False))
+        finally:
+            for source in (sources or {}).values():
+                source.close()
+            shutil.rmtree(os.path.join(self.files_dir, job_id), ignore_errors=True)
+
+    def get(self, job_id):
+        """작업 상태 조회 (없으면 None)"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, kind, status, progress, stage, messages, partial, result, error, "
+                "created, started, finished, trace FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        (job_id, kind, status, progress, stage, messages, partial, result, error,
+         created, started, finished, trace) = row
+        return {
+            "id": job_id,
+            "kind": kind,
+            "status": status,
+            "progress": progress,
+            "stage": stage,
+            "messages": json.loads(messages) if messages else [],
+            "partial": partial,
+            "result": json.loads(zlib.decompress(result).decode("utf-8")) if result else None,
+            "error": error,
+            "created": created,
+            "started": started,
+            "finished": finished,
+            "trace": json.loads(trace) if trace else [],
+            "position": self._queue_position(job_id, created) if status == QUEUED else 0
+        }
+
+    def _queue_position(self, job_id, created):
+        """대기열에서 앞선 작업 수"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND owner_pid = ? AND created < ?",
+                (QUEUED, os.getpid(), created)
+            ).fetchone()[0]
+
+    def pending_count(self):
+        """이 프로세스의 대기/실행 중 작업 수"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?) AND owner_pid = ?",
+                (*ACTIVE_STATUSES, os.getpid())
+            ).fetchone()[0]
+
+    def purge(self, max_age=None):
+        """보관 기간이 지난 완료 작업 삭제"""
+        if max_age is None:
+            max_age = JOB_RETENTION_SECONDS
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished < ?",
+                (DONE, FAILED, time.time() - max_age)
+            )
+
+    def stats(self):
+        """상태별 작업 수와 동시 실행 상한"""
+        with self._connect() as conn:
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE owner_pid = ? GROUP BY status", (os.getpid(),)
+            ).fetchall())
+        return {
+            "queued": counts.get(QUEUED, 0),
+            "running": counts.get(RUNNING, 0),
+            "done": counts.get(DONE, 0),
+            "failed": counts.get(FAILED, 0),
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending
+        }
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """프로세스 공용 작업 큐"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
@@ -0,0 +1,257 @@
+import os
+import time
+import json
+import random
+import hashlib
+import threading
+from email.utils import parsedate_to_datetime
+from cache import TTLCache, RequestCoalescer
+from context import count_tokens
+import metrics
+
+# ----- 공용 LLM 클라이언트 설정 -----
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+# 연결/응답 대기 타임아웃 (초)
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+
+# 재시도 설정 (429/5xx/연결 오류)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+
+# 프로세스 전체에서 동시에 진행할 LLM 요청 수
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# 결정적 요청(temperature 0) 응답 캐시
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+
+# 스트리밍 중 화면 갱신 최소 간격 (초) - 토큰마다 다시 그리지 않도록 제한
+STREAM_RENDER_INTERVAL = 0.1
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+response_cache = TTLCache(ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES)
+response_coalescer = RequestCoalescer()
+concurrency_limiter = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key):
+    """API 키별 공용 OpenAI 클라이언트 (연결 재사용, 재시도는 call_with_retry에서 처리)"""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            # openai/httpx는 import만 수백 ms가 걸리므로 첫 보고서 생성 시점에 로드 (앱 시작 시간 단축)
+            import httpx
+            from openai import OpenAI
+
+            client = OpenAI(
+                api_key=api_key,
+                base_url=OPENAI_BASE_URL,
+                timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+                max_retries=0,
+                http_client=httpx.Client(
+                    limits=httpx.Limits(max_connections=LLM_MAX_CONCURRENCY * 2,
+                                        max_keepalive_connections=LLM_MAX_CONCURRENCY)
+                )
+            )
+            _clients[api_key] = client
+        return client
+
+
+def retry_after_seconds(error):
+    """오류 응답의 Retry-After 헤더 값 (초, 없으면 None)"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def is_retryable(error):
+    """재시도할 만한 오류인지 판별"""
+    import openai
+
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS
+    return False
+
+
+def backoff_delay(attempt, error=None):
+    """지수 백오프 + full jitter (Retry-After가 있으면 우선)"""
+    retry_after = retry_after_seconds(error) if error is not None else None
+    if retry_after is not None:
+        return min(retry_after, LLM_BACKOFF_MAX)
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+def call_with_retry(func, max_retries=None):
+    """동시성 제한 안에서 func 실행, 재시도 가능한 오류는 백오프 후 재시도"""
+    if max_retries is None:
+        max_retries = LLM_MAX_RETRIES
+
+    attempt = 0
+    while True:
+        try:
+            with concurrency_limiter:
+                return func()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, e)
+            print(f"LLM 요청 재시도 {attempt + 1}/{max_retries} ({delay:.1f}초 후): {str(e)}")
+            time.sleep(delay)
+            attempt += 1
+
+
+def cache_key(model, messages, temperature, max_tokens):
+    """프롬프트 해시 캐시 키 (결정적 설정에서만 사용)"""
+    if temperature != 0:
+        return None
+    payload = json.dumps([model, messages, max_tokens], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def chat(client, model, messages, temperature, max_tokens, use_cache=True):
+    """채팅 응답 텍스트 (재시도 + 동시성 제한 + 결정적 요청 캐시)"""
+    key = cache_key(model, messages, temperature, max_tokens) if use_cache else None
+    if key is not None:
+        cached = response_cache.get(key)
+        if cached is not None:
+            metrics.record(cache_hits=1)
+            return cached
+
+    def request():
+        response = call_with_retry(lambda: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        ))
+        text = response.choices[0].message.content
+        usage = response.usage
+        metrics.record(
+            requests=1,
+            prompt_tokens=usage.prompt_tokens if usage else sum(count_tokens(m["content"]) for m in messages),
+            completion_tokens=usage.completion_tokens if usage else count_tokens(text or "")
+        )
+        if key is not None and text:
+            response_cache.set(key, text)
+        return text
+
+    if key is None:
+        return request()
+    # 같은 프롬프트의 동시 요청은 한 번만 호출
+    return response_coalescer.run(key, request)
+
+
+def stream_chat(client, model, messages, temperature, max_tokens, on_text=None, use_cache=True):
+    """채팅 응답을 스트림으로 받아 누적 텍스트를 on_text로 전달. (전체 텍스트, 타이밍) 반환"""
+    started = time.perf_counter()
+
+    key = cache_key(model, messages, temperature, max_tokens) if use_cache else None
+    if key is not None:
+        cached = response_cache.get(key)
+        if cached is not None:
+            metrics.record(cache_hits=1)
+            if on_text:
+                on_text(cached)
+            elapsed = round(time.perf_counter() - started, 3)
+            return cached, {"ttft": elapsed, "seconds": elapsed, "cached": True}
+
+    first_token_at = None
+    last_render = 0.0
+    parts = []
+
+    def consume():
+        nonlocal first_token_at, last_render
+        # 재시도 시에는 스트림을 처음부터 다시 받음
+        parts.clear()
+        first_token_at = None
+
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+
+            now = time.perf_counter()
+            if first_token_at is None:
+                first_token_at = now
+            parts.append(delta)
+
+            if on_text and now - last_render >= STREAM_RENDER_INTERVAL:
+                on_text("".join(parts))
+                last_render = now
+
+    call_with_retry(consume)
+
+    text = "".join(parts)
+    # 스트리밍 응답에는 usage가 없으므로 토큰 수는 근사값
+    metrics.record(
+        requests=1,
+        prompt_tokens=sum(count_tokens(m["content"]) for m in messages),
+        completion_tokens=count_tokens(text)
+    )
+    if on_text:
+        on_text(text)
+    if key is not None and text:
+        response_cache.set(key, text)
+
+    finished = time.perf_counter()
+    timings = {
+        "ttft": round(first_token_at - started, 3) if first_token_at else None,
+        "seconds": round(finished - started, 3),
+        "cached": False
+    }
+    return text, timings
+
+
+def chat_llm(client, model):
+    """chat을 llm(messages, temperature, max_tokens) -> str 형태로 감쌈"""
+    def call(messages, temperature, max_tokens):
+        return chat(client, model, messages, temperature, max_tokens)
+    return call
+
+
+def streaming_llm(client, model, on_text=None, timings=None):
+    """stream_chat을 llm(messages, temperature, max_tokens) -> str 형태로 감쌈 (타이밍은 timings에 기록)"""
+    def call(messages, temperature, max_tokens):
+        text, call_timings = stream_chat(client, model, messages, temperature, max_tokens, on_text)
+        if timings is not None:
+            timings.update(call_timings)
+        return text
+    return call
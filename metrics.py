@@ -0,0 +1,304 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+try:
+    import resource
+except ImportError:  # Windows에는 없음: 프로세스 최대 RSS 노출 안 함
+    resource = None
+
+# ----- 단계별 계측 (span) 설정 -----
+
+# span JSON 로그 출력 대상: stdout, 파일 경로, off
+METRICS_LOG = os.getenv("METRICS_LOG", "off")
+
+# Prometheus 텍스트 형식 /metrics 포트 (0이면 사용 안 함)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# 단계 소요 시간 히스토그램 버킷 (초)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# span에 누적하는 수치 항목
+COUNTER_FIELDS = ("bytes_in", "bytes_out", "prompt_tokens", "completion_tokens",
+                  "requests", "cache_hits", "pages")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def current_rss_mb():
+    """현재 프로세스 RSS (MB, /proc가 없는 플랫폼에서는 None)"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024, 1)
+
+
+def process_max_rss_mb():
+    """프로세스가 지금까지 사용한 최대 RSS (MB, resource 모듈이 없으면 None, macOS는 바이트 단위로 보고됨)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return round(peak / 1024 / 1024, 1)
+    return round(peak / 1024, 1)
+
+
+class Span:
+    """단계 1건의 측정값 (벽시계 시간, 구간 동안의 프로세스 CPU 시간/RSS 변화, 바이트/토큰 수)"""
+
+    def __init__(self, name, trace_id, parent=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.parent = parent
+        self.started = time.time()
+        self.wall_seconds = None
+        self.process_cpu_seconds = None
+        self.rss_mb = None
+        self.rss_delta_mb = None
+        self.error = None
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add(self, **counters):
+        """수치 누적 (여러 스레드에서 호출 가능)"""
+        with self._lock:
+            for key, value in counters.items():
+                if value:
+                    self.counters[key] = self.counters.get(key, 0) + value
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "parent": self.parent,
+            "started": round(self.started, 3),
+            "wall_seconds": self.wall_seconds,
+            "process_cpu_seconds": self.process_cpu_seconds,
+            "rss_mb": self.rss_mb,
+            "rss_delta_mb": self.rss_delta_mb,
+            "error": self.error,
+            **self.counters
+        }
+
+
+def record(**counters):
+    """현재 span에 바이트/토큰 등 수치 누적 (span 밖에서는 무시)"""
+    span = _current_span.get()
+    if span is not None:
+        span.add(**counters)
+
+
+def bind(func):
+    """현재 span을 스레드 풀 작업에서도 이어 쓰도록 컨텍스트를 묶은 함수 반환"""
+    context = contextvars.copy_context()
+
+    def call(*args, **kwargs):
+        # 같은 Context를 여러 스레드가 동시에 쓸 수 없으므로 호출마다 복사
+        return context.copy().run(func, *args, **kwargs)
+    return call
+
+
+class Trace:
+    """작업 1건의 span 목록과 계획된 단계 가중치 (진행률 계산용)"""
+
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:12]
+        self.spans = []
+        self.planned = {}
+        self._lock = threading.Lock()
+
+    def plan(self, weights):
+        """실행할 최상위 단계와 가중치 지정 {단계 이름: 가중치}"""
+        self.planned = dict(weights)
+
+    @contextmanager
+    def span(self, name):
+        parent = _current_span.get()
+        span = Span(name, self.trace_id, parent.name if parent else None)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        rss_started = current_rss_mb()
+        try:
+            yield span
+        except Exception as e:
+            span.error = str(e)
+            raise
+        finally:
+            # CPU 시간과 RSS는 프로세스 전체 기준 (워커 스레드 포함, 동시 작업이 있으면 함께 집계됨)
+            span.wall_seconds = round(time.perf_counter() - started, 4)
+            span.process_cpu_seconds = round(time.process_time() - cpu_started, 4)
+            span.rss_mb = current_rss_mb()
+            if span.rss_mb is not None and rss_started is not None:
+                span.rss_delta_mb = round(span.rss_mb - rss_started, 1)
+            _current_span.reset(token)
+            with self._lock:
+                self.spans.append(span)
+            registry.observe(span)
+            log_span(span)
+
+    def progress(self):
+        """완료된 최상위 단계의 가중치 비율 (0~1)"""
+        total = sum(self.planned.values())
+        if not total:
+            return 0.0
+        with self._lock:
+            done = {span.name for span in self.spans if span.parent is None}
+        return round(sum(weight for name, weight in self.planned.items() if name in done) / total, 3)
+
+    def summary(self):
+        """span 목록 (완료 순)"""
+        with self._lock:
+            return [span.to_dict() for span in self.spans]
+
+
+_log_lock = threading.Lock()
+
+
+def log_span(span):
+    """span 1건을 JSON 한 줄로 기록"""
+    if not METRICS_LOG or METRICS_LOG == "off":
+        return
+    line = json.dumps({"event": "span", **span.to_dict()}, ensure_ascii=False)
+    with _log_lock:
+        if METRICS_LOG == "stdout":
+            print(line)
+        else:
+            with open(METRICS_LOG, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class MetricsRegistry:
+    """단계별 누적 통계 (Prometheus 텍스트 형식으로 출력)"""
+
+    def __init__(self):
+        self.stages = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def observe(self, span):
+        with self._lock:
+            stage = self.stages.setdefault(span.name, {
+                "count": 0, "errors": 0, "wall_sum": 0.0, "cpu_sum": 0.0,
+                "buckets": [0] * len(LATENCY_BUCKETS), "counters": {}
+            })
+            stage["count"] += 1
+            stage["errors"] += 1 if span.error else 0
+            stage["wall_sum"] += span.wall_seconds
+            stage["cpu_sum"] += span.process_cpu_seconds
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if span.wall_seconds <= bound:
+                    stage["buckets"][i] += 1
+            for key, value in span.counters.items():
+                stage["counters"][key] = stage["counters"].get(key, 0) + value
+
+    def gauge(self, prefix, collect):
+        """조회 시점 값을 노출할 함수 등록 (collect는 {이름: 값} 반환, _total로 끝나면 counter)"""
+        with self._lock:
+            self.gauges[prefix] = collect
+
+    def render_prometheus(self):
+        """Prometheus 텍스트 노출 형식"""
+        lines = [
+            "# HELP report_stage_seconds Wall time per pipeline stage",
+            "# TYPE report_stage_seconds histogram"
+        ]
+        with self._lock:
+            stages = {name: dict(stage, buckets=list(stage["buckets"]), counters=dict(stage["counters"]))
+                      for name, stage in self.stages.items()}
+
+        for name, stage in sorted(stages.items()):
+            for bound, count in zip(LATENCY_BUCKETS, stage["buckets"]):
+                lines.append(f'report_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'report_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {stage["count"]}')
+            lines.append(f'report_stage_seconds_sum{{stage="{name}"}} {stage["wall_sum"]:.4f}')
+            lines.append(f'report_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+
+        lines.append("# HELP report_stage_process_cpu_seconds_total Process CPU time elapsed during each stage "
+                     "(includes concurrent jobs)")
+        lines.append("# TYPE report_stage_process_cpu_seconds_total counter")
+        for name, stage in sorted(stages.items()):
+            lines.append(f'report_stage_process_cpu_seconds_total{{stage="{name}"}} {stage["cpu_sum"]:.4f}')
+
+        lines.append("# TYPE report_stage_errors_total counter")
+        for name, stage in sorted(stages.items()):
+            lines.append(f'report_stage_errors_total{{stage="{name}"}} {stage["errors"]}')
+
+        for field in COUNTER_FIELDS:
+            lines.append(f"# TYPE report_stage_{field}_total counter")
+            for name, stage in sorted(stages.items()):
+                if field in stage["counters"]:
+                    lines.append(f'report_stage_{field}_total{{stage="{name}"}} {stage["counters"][field]}')
+
+        for metric, value in (("process_resident_megabytes", current_rss_mb()),
+                              ("process_max_resident_megabytes", process_max_rss_mb())):
+            if value is not None:
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+
+        with self._lock:
+            gauges = dict(self.gauges)
+        for prefix, collect in sorted(gauges.items()):
+            try:
+                values = collect()
+            except Exception as e:
+                # 값 하나를 못 읽어도 나머지 메트릭은 노출
+                print(f"메트릭 수집 오류 ({prefix}): {str(e)}")
+                continue
+            for name, value in values.items():
+                metric = f"{prefix}_{name}"
+                lines.append(f"# TYPE {metric} {'counter' if name.endswith('_total') else 'gauge'}")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None):
+    """/metrics 엔드포인트를 백그라운드 스레드로 시작 (프로세스당 한 번, 포트가 0이면 무시)"""
+    global _metrics_server
+    if port is None:
+        port = METRICS_PORT
+    if not port:
+        return None
+
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            try:
+                _metrics_server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError as e:
+                # 재실행마다 다시 시도하지 않도록 실패도 기록
+                print(f"메트릭 서버 시작 오류 (포트 {port}): {str(e)}")
+                _metrics_server = False
+                return None
+            threading.Thread(target=_metrics_server.serve_forever, daemon=True, name="metrics-server").start()
+        return _metrics_server or None
@@ -0,0 +1,148 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from cache import get_extraction_cache
+from extraction import page_blocks
+from ingest import DocumentSource
+
+# ----- 스캔 PDF OCR 설정 (MuPDF 내장 Tesseract, CPU 전용) -----
+
+# auto: 언어 데이터가 있으면 텍스트 없는 페이지만 OCR, off: 사용 안 함
+PDF_OCR = os.getenv("PDF_OCR", "auto")
+
+# Tesseract 언어 (+로 여러 개), 렌더링 해상도
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "kor+eng")
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+
+# OCR 프로세스 수 (페이지당 렌더링 이미지가 수십 MB이므로 코어 수와 별개로 제한)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+
+# 추출 텍스트가 이 글자 수 미만이고 이미지가 있는 페이지를 스캔 페이지로 판단
+OCR_MIN_CHARS = int(os.getenv("OCR_MIN_CHARS", "20"))
+
+# Tesseract 언어 데이터 위치 (미설정 시 TESSDATA_PREFIX 또는 설치된 Tesseract에서 탐색)
+OCR_TESSDATA = os.getenv("OCR_TESSDATA") or os.getenv("TESSDATA_PREFIX")
+
+_tessdata = None
+
+
+def find_tessdata():
+    """요청한 언어 데이터가 모두 있는 tessdata 디렉터리 (없으면 None, 결과는 프로세스당 한 번만 탐색)"""
+    global _tessdata
+    if _tessdata is None:
+        candidates = [OCR_TESSDATA]
+        try:
+            import fitz  # PyMuPDF
+
+            candidates.append(fitz.get_tessdata())
+        except Exception:
+            # Tesseract가 설치되지 않은 환경
+            pass
+
+        _tessdata = ""
+        for directory in filter(None, candidates):
+            if all(os.path.exists(os.path.join(directory, f"{language}.traineddata"))
+                   for language in OCR_LANGUAGE.split("+")):
+                _tessdata = directory
+                break
+    return _tessdata or None
+
+
+def ocr_enabled():
+    """OCR 사용 가능 여부 (설정이 off가 아니고 언어 데이터가 있음)"""
+    return PDF_OCR != "off" and find_tessdata() is not None
+
+
+def ocr_cache_tag():
+    """추출 캐시 키에 붙이는 OCR 설정 (OCR 사용 여부/언어/해상도가 바뀌면 다시 추출)"""
+    if not ocr_enabled():
+        return "no-ocr"
+    return f"ocr-{OCR_LANGUAGE}-{OCR_DPI}"
+
+
+def needs_ocr(page, min_chars=None):
+    """텍스트가 거의 없고 이미지가 있는 (스캔) 페이지인지"""
+    if min_chars is None:
+        min_chars = OCR_MIN_CHARS
+    return bool(page["images"]) and len(page["text"].strip()) < min_chars
+
+
+def ocr_page(file_path, page_number, dpi, language, tessdata):
+    """프로세스 워커용: 페이지 1개를 렌더링해 OCR한 텍스트 블록 반환"""
+    import fitz  # PyMuPDF
+
+    with fitz.open(file_path) as doc:
+        page = doc[page_number]
+        pixmap = page.get_pixmap(dpi=dpi)
+        ocr_pdf = fitz.open("pdf", pixmap.pdfocr_tobytes(language=language, tessdata=tessdata))
+        try:
+            # OCR 결과 페이지는 렌더링 해상도 기준 크기이므로 좌표만 원본 페이지 크기로 환산 (위/아래 비율은 같음)
+            scale = page.rect.width / ocr_pdf[0].rect.width
+            blocks = page_blocks(ocr_pdf[0])
+            for block in blocks:
+                block["bbox"] = [round(value * scale, 1) for value in block["bbox"]]
+            return blocks
+        finally:
+            ocr_pdf.close()
+
+
+def ocr_pages(source, page_numbers, dpi=None, language=None, workers=None):
+    """지정한 페이지만 OCR해 {페이지 번호: 텍스트 블록} 반환 (페이지 단위 캐시, 나머지는 프로세스 풀)"""
+    if dpi is None:
+        dpi = OCR_DPI
+    if language is None:
+        language = OCR_LANGUAGE
+    if workers is None:
+        workers = OCR_WORKERS
+    tessdata = find_tessdata()
+
+    cache = get_extraction_cache()
+    file_hash = source.sha256() if isinstance(source, DocumentSource) else None
+    file_path = source.ensure_path() if isinstance(source, DocumentSource) else source
+
+    def cache_key(page_number):
+        return cache.make_key(file_hash, f"ocr-page-{page_number}", f"{language}-{dpi}")
+
+    # 같은 문서를 다시 올리면 이미 OCR한 페이지는 건너뜀
+    results = {}
+    missing = []
+    for page_number in page_numbers:
+        cached = cache.get(cache_key(page_number)) if file_hash else None
+        if cached is not None:
+            results[page_number] = cached["blocks"]
+        else:
+            missing.append(page_number)
+
+    def store(page_number, blocks):
+        results[page_number] = blocks
+        if file_hash:
+            cache.put(cache_key(page_number), {"blocks": blocks})
+
+    def run_serial(pending):
+        for page_number in pending:
+            try:
+                store(page_number, ocr_page(file_path, page_number, dpi, language, tessdata))
+            except Exception as e:
+                # 한 페이지 실패로 나머지 추출 결과를 잃지 않도록 해당 페이지만 건너뜀
+                print(f"OCR 오류 ({page_number + 1}쪽): {str(e)}")
+
+    if len(missing) <= 1 or workers <= 1:
+        run_serial(missing)
+        return results
+
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(missing))) as executor:
+            futures = {page_number: executor.submit(ocr_page, file_path, page_number, dpi, language, tessdata)
+                       for page_number in missing}
+            for page_number, future in futures.items():
+                try:
+                    store(page_number, future.result())
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    print(f"OCR 오류 ({page_number + 1}쪽): {str(e)}")
+    except (BrokenProcessPool, OSError) as e:
+        # 프로세스 생성이 불가능한 환경에서는 남은 페이지를 직렬로 처리
+        print(f"OCR 병렬 처리 실패, 직렬 처리로 전환: {str(e)}")
+        run_serial([page_number for page_number in missing if page_number not in results])
+    return results
@@ -0,0 +1,643 @@
+import os
+import json
+import hashlib
+from contextlib import ExitStack, contextmanager
+import firecrawl
+from firecrawl import FIRECRAWL_BASE_URL
+from research import fan_out_research
+from context import pack_context, count_tokens, CONTEXT_TOKEN_BUDGET
+from report import build_report_prompt, build_report_messages, select_report_sections, REPORT_MODEL, REPORT_MAX_TOKENS
+from summarize import summarize_context
+from llm import get_client, chat, chat_llm, streaming_llm
+from extraction import iter_pdf_pages, strip_boilerplate, extract_docx_parts, EXTRACTOR_VERSION
+from ocr import needs_ocr, ocr_enabled, ocr_pages, ocr_cache_tag, PDF_OCR
+from images import index_pdf_images, index_docx_images, prepare_images, image_to_record, image_from_record
+from ingest import open_document
+from cache import get_extraction_cache, TTLCache
+from corpus import get_corpus
+import metrics
+from metrics import Trace
+
+# ----- 보고서 생성 파이프라인 (UI와 분리, 진행 상황은 Reporter로 전달) -----
+
+# 단계별 결과 캐시 (같은 세션에서 출력 옵션만 바꿔 다시 생성할 때 수집/컨텍스트/초안 재사용)
+STAGE_CACHE_TTL = int(os.getenv("STAGE_CACHE_TTL", "3600"))
+STAGE_CACHE_MAX_ENTRIES = int(os.getenv("STAGE_CACHE_MAX_ENTRIES", "64"))
+stage_cache = TTLCache(ttl=STAGE_CACHE_TTL, max_entries=STAGE_CACHE_MAX_ENTRIES)
+
+
+class Reporter:
+    """파이프라인 메시지/진행률/단계 계측 수신 (기본 구현은 메시지와 span만 보관)"""
+
+    def __init__(self):
+        self.messages = []
+        self.trace = Trace()
+
+    def message(self, level, text):
+        self.messages.append((level, text))
+
+    def info(self, text):
+        self.message("info", text)
+
+    def success(self, text):
+        self.message("success", text)
+
+    def warning(self, text):
+        self.message("warning", text)
+
+    def error(self, text):
+        self.message("error", text)
+
+    def progress(self, value, stage=None):
+        """진행률 (0~1)과 현재 단계 설명"""
+
+    def partial(self, text):
+        """스트리밍 중인 보고서 본문"""
+
+    @contextmanager
+    def stage(self, name, label=None):
+        """단계 span 기록 (완료 시 계획된 단계 가중치로 진행률 갱신)"""
+        self.progress(self.trace.progress(), label)
+        with self.trace.span(name) as span:
+            yield span
+        self.progress(self.trace.progress())
+
+
+def firecrawl_research(query, api_key, domains=None, reporter=None):
+    """Firecrawl API를 사용한 웹 데이터 수집"""
+    reporter = reporter or Reporter()
+
+    # Firecrawl API 호출
+    try:
+        # 최신 문서에 맞는 API 엔드포인트 (v1 버전 지정)
+        url = f"{FIRECRAWL_BASE_URL}/v1/search"
+
+        # 개행 문자 제거 및 양쪽 공백 제거
+        query = query.strip()
+
+        # API 요청 페이로드 (v1 API 문서 기준 업데이트)
+        payload = {
+            "query": query  # ✅ 현재 Firecrawl v1에서 허용된 유일한 key
+        }
+
+        # 참고: v1 API에서는 'sites', 'num_results', 'lang', 'time_range' 필드가 지원되지 않음
+        # domains 파라미터는 요청에 포함되지 않고 캐시 키에만 반영됨
+
+        # API 호출 전 로그
+        reporter.info(f"Firecrawl API 호출 중: {url}")
+        reporter.info(f"API 키: {api_key[:5]}...{api_key[-5:]}")
+        reporter.info(f"요청 페이로드: {payload}")
+
+        try:
+            # 공용 세션 + 타임아웃, 동일 질의는 캐시/진행 중 요청을 공유
+            result_data, from_cache = firecrawl.search(query, api_key, domains)
+        except firecrawl.FirecrawlError as e:
+            # API 오류시 상세 정보 표시 및 예시 데이터 반환
+            error_msg = f"API 오류 (예시 데이터 사용): {e.status_code}, {e.text}"
+            reporter.warning(error_msg)
+            print(error_msg)
+
+            # API 키 검증 문제인 경우
+            if e.status_code == 401:
+                reporter.error("API 키가 유효하지 않습니다. 환경 변수 FIRECRAWL_API_KEY를 확인하세요.")
+
+            return get_example_data(reporter)
+
+        if from_cache:
+            reporter.info("캐시된 검색 결과를 사용합니다.")
+
+        # 디버깅용 응답 출력
+        reporter.info(f"API 응답: {list(result_data.keys())}")
+
+        # 결과 포맷팅 (Firecrawl v1 API 응답 형식에 맞게 조정)
+        formatted_results, results = firecrawl.format_search_results(result_data)
+
+        # 응답 메시지
+        reporter.success(f"Firecrawl API 검색 결과: {len(results)}건 조회됨")
+
+        # 응답이 비어 있으면 예시 데이터 사용
+        if not formatted_results["text_content"]:
+            reporter.warning("검색 결과가 없어 예시 데이터를 사용합니다.")
+            return get_example_data(reporter)
+
+        return formatted_results
+    except Exception as e:
+        # 예외 발생시 상세 정보 표시
+        error_msg = f"API 연결 오류 (예시 데이터 사용): {str(e)}"
+        reporter.warning(error_msg)
+        print(error_msg)
+        return get_example_data(reporter)
+
+
+def deep_research(query, api_key, domains=None, max_queries=4, scrape_top=0, reporter=None):
+    """다중 하위 질의를 동시에 검색하는 심층 웹 데이터 수집"""
+    reporter = reporter or Reporter()
+    try:
+        research_data = fan_out_research(query.strip(), api_key, domains,
+                                         max_queries=max_queries, scrape_top=scrape_top)
+
+        reporter.info(f"하위 질의 {len(research_data['queries'])}건 동시 검색 완료 ({research_data['seconds']}초)")
+        for error in research_data["errors"]:
+            print(f"심층 리서치 오류: {error}")
+
+        # 응답이 비어 있으면 예시 데이터 사용
+        if not research_data["text_content"]:
+            reporter.warning("검색 결과가 없어 예시 데이터를 사용합니다.")
+            return get_example_data(reporter)
+
+        reporter.success(f"Firecrawl 심층 리서치 결과: 출처 {len(research_data['sources'])}건 수집됨")
+        return research_data
+    except Exception as e:
+        error_msg = f"API 연결 오류 (예시 데이터 사용): {str(e)}"
+        reporter.warning(error_msg)
+        print(error_msg)
+        return get_example_data(reporter)
+
+
+def get_example_data(reporter=None):
+    """데모용 예시 데이터"""
+    (reporter or Reporter()).info("예시 데이터를 사용합니다.")
+    return {
+        "text_content": [
+            "생성형 AI 시장은 2025년까지 연간 38% 성장할 것으로 예상된다.",
+            "기업들은 AI를 활용한 업무 자동화에 투자를 확대하고 있다.",
+            "ChatGPT와 같은 대화형 AI는 고객 서비스 분야에서 혁신을 일으키고 있다.",
+            "Google DeepMind의 최신 연구에 따르면 AI 모델의 성능이 매년 2배씩 향상되고 있다."
+        ],
+        "images": [
+            ("https://mblogthumb-phinf.pstatic.net/MjAyMzA0MThfMTA0/MDAxNjgxNzg2NDk1MzM4.Cz-AbXLhvkdrYGEQXS_D7P3y3rQooUW-pRXCIhKJEnAg.a5B2vWMe8YdBOZENDBmJ-VlE-vGnI2qJKBYx6YfhZ2Ig.PNG.esaracen/IMG_2.png", "AI 시장 성장 예측 그래프"),
+            ("https://blog.kakaocdn.net/dn/bYoLUJ/btr8nQs0KRy/UXgAC0AWypxQJLKlkSrDDK/img.png", "ChatGPT 인터페이스")
+        ],
+        "sources": [
+            "https://techcrunch.com/2023/05/15/ai-market-growth",
+            "https://www.mckinsey.com/ai-adoption-survey-2023",
+            "https://research.google/blog/ai-trends-2024"
+        ]
+    }
+
+
+def extract_from_pdf(source, workers=None, reporter=None):
+    """PDF 파일에서 텍스트와 이미지 추출 (페이지 샤드 병렬 처리, 스캔 페이지는 OCR)"""
+    reporter = reporter or Reporter()
+    result = {
+        "text_content": [],
+        "images": []
+    }
+
+    try:
+        # 페이지 결과를 순서대로 모은 뒤 병합 (큰 PDF는 샤드 단위 병렬 추출)
+        pages = []
+        image_pages = []
+        for page in iter_pdf_pages(source, workers=workers):
+            metrics.record(pages=1)
+            pages.append(page)
+            if page["images"]:
+                image_pages.append({"page": page["page"], "images": page["images"]})
+
+        # 텍스트 없는 스캔 페이지만 골라 OCR (텍스트가 있는 페이지는 비용 없음)
+        scanned = [page for page in pages if needs_ocr(page)]
+        if scanned and ocr_enabled():
+            reporter.info(f"텍스트가 없는 스캔 페이지 {len(scanned)}쪽 OCR 처리 중...")
+            with reporter.trace.span("ocr"):
+                recognized = ocr_pages(source, [page["page"] for page in scanned])
+            for page in scanned:
+                blocks = recognized.get(page["page"])
+                if blocks:
+                    page["blocks"] = blocks
+                    page["text"] = "\n\n".join(block["text"] for block in blocks)
+        elif scanned and PDF_OCR != "off":
+            reporter.warning(f"텍스트가 없는 스캔 페이지 {len(scanned)}쪽은 OCR 언어 데이터(Tesseract tessdata)가 "
+                             f"없어 건너뜁니다.")
+
+        # 여러 페이지에 반복되는 머리글/바닥글/쪽 번호는 모든 페이지를 본 뒤에만 판별 가능
+        removed = strip_boilerplate(pages)
+        if removed:
+            reporter.info(f"PDF 반복 머리글/바닥글/쪽 번호 {removed}개 블록 제외")
+        result["text_content"] = [page["text"] for page in pages if page["text"].strip()]
+
+        # 이미지는 xref/내용 해시로 중복 제거한 지연 참조로만 보관
+        result["images"] = index_pdf_images(source, image_pages)
+    except Exception as e:
+        error_msg = f"PDF 추출 오류: {str(e)}"
+        reporter.error(error_msg)
+        print(error_msg)
+
+    return result
+
+
+def extract_from_docx(source, reporter=None):
+    """Word 문서에서 텍스트(문단, 표, 머리글/바닥글)와 이미지 추출"""
+    result = {
+        "text_content": [],
+        "images": []
+    }
+
+    try:
+        # zip 항목을 한 번씩만 읽어 본문 순서대로 문단/표 텍스트와 이미지 위치 수집
+        parts = extract_docx_parts(source)
+        result["text_content"] = parts["text_content"]
+        if parts["header_footer"]:
+            result["text_content"].append("머리글/바닥글: " + "\n".join(parts["header_footer"]))
+
+        # 이미지는 내용 기준으로 중복 제거한 지연 참조로만 보관 (바이트는 사용할 때 word/media에서 읽음)
+        result["images"] = index_docx_images(source, parts["images"])
+    except Exception as e:
+        error_msg = f"DOCX 추출 오류: {str(e)}"
+        (reporter or Reporter()).error(error_msg)
+        print(error_msg)
+
+    return result
+
+
+def extract_document(source, reporter=None):
+    """업로드 문서 추출 (파일 해시 기반 캐시 우선 사용)"""
+    extraction_cache = get_extraction_cache()
+    # PDF는 OCR 사용 여부/설정이 결과를 바꾸므로 캐시 키에 포함
+    version = f"{EXTRACTOR_VERSION}+{ocr_cache_tag()}" if source.suffix == ".pdf" else EXTRACTOR_VERSION
+    cache_key = extraction_cache.make_key(source.sha256(), source.suffix, version)
+    metrics.record(bytes_in=source.size)
+
+    # 같은 문서를 다시 올리거나 옵션만 바꿔 재생성하는 경우 추출을 건너뜀
+    cached = extraction_cache.get(cache_key)
+    if cached is not None:
+        metrics.record(cache_hits=1)
+        return {
+            "text_content": cached["text_content"],
+            "images": [image_from_record(source, record) for record in cached["images"]]
+        }
+
+    # 파일 형식에 따라 처리
+    if source.suffix == '.pdf':
+        result = extract_from_pdf(source, reporter=reporter)
+    elif source.suffix == '.docx':
+        result = extract_from_docx(source, reporter=reporter)
+    else:
+        return {"text_content": [], "images": []}
+
+    # 추출 결과가 있는 경우에만 저장 (오류로 빈 결과가 캐시되지 않도록)
+    if result["text_content"] or result["images"]:
+        try:
+            extraction_cache.put(cache_key, {
+                "text_content": result["text_content"],
+                "images": [image_to_record(img, caption) for img, caption in result["images"]]
+            })
+        except Exception as e:
+            print(f"추출 캐시 저장 오류: {str(e)}")
+
+    return result
+
+
+def stage_key(stage, *parts):
+    """단계 이름과 입력값으로 단계 캐시 키 생성"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return f"{stage}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def collection_inputs(params, source=None):
+    """수집 결과를 결정하는 입력값 (질의, 검색 옵션, 문서 내용 해시, 코퍼스 검색 범위)"""
+    inputs = {
+        "user_query": params.get("user_query", "").strip(),
+        "reference_domains": params.get("reference_domains"),
+        "deep_research": bool(params.get("deep_research")),
+        "document": source.sha256() if source is not None else None
+    }
+    if inputs["deep_research"]:
+        inputs["research_query_count"] = params.get("research_query_count", 4)
+        inputs["research_scrape_top"] = params.get("research_scrape_top", 0)
+    if params.get("corpus_top_k") and inputs["user_query"]:
+        inputs["corpus_top_k"] = params["corpus_top_k"]
+        inputs["corpus_documents"] = params.get("corpus_documents")
+        # 코퍼스에 문서가 추가/삭제되면 검색 결과가 달라지므로 다시 수집
+        # (삭제된 문서 ID가 재사용될 수 있어 내용 해시와 함께 비교)
+        inputs["corpus"] = sorted((d["id"], d["sha256"]) for d in get_corpus().documents())
+    return inputs
+
+
+def collect_data(params, source=None, reporter=None):
+    """웹 검색, 업로드 문서, 코퍼스에서 보고서 재료 수집"""
+    reporter = reporter or Reporter()
+    firecrawl_api_key = os.getenv("FIRECRAWL_API_KEY")
+    user_query = params.get("user_query", "")
+    corpus_top_k = params.get("corpus_top_k", 0)
+
+    collected_data = {
+        "text_content": [],
+        "images": [],
+        "sources": []
+    }
+
+    # 1-A: Firecrawl API를 통한 웹 데이터 수집 (질문이 있는 경우)
+    if user_query:
+        try:
+            with reporter.stage("web_research", "웹 데이터 수집 중..."):
+                # Firecrawl API 호출 (개행 문자 및 공백 제거)
+                if params.get("deep_research"):
+                    firecrawl_data = deep_research(user_query.strip(), firecrawl_api_key,
+                                                   params.get("reference_domains"),
+                                                   max_queries=params.get("research_query_count", 4),
+                                                   scrape_top=params.get("research_scrape_top", 0),
+                                                   reporter=reporter)
+                else:
+                    firecrawl_data = firecrawl_research(user_query.strip(), firecrawl_api_key,
+                                                        params.get("reference_domains"), reporter=reporter)
+
+            collected_data["text_content"].extend(firecrawl_data.get("text_content", []))
+            collected_data["images"].extend(firecrawl_data.get("images", []))
+            collected_data["sources"].extend(firecrawl_data.get("sources", []))
+        except Exception as e:
+            reporter.error(f"웹 데이터 수집 중 오류 발생: {str(e)}")
+
+    # 1-B: 업로드된 문서 처리 (파일이 있는 경우)
+    if source is not None:
+        try:
+            with reporter.stage("document_extract", "문서 분석 중..."):
+                # 파일 형식에 따라 처리 (동일 파일은 추출 캐시 사용)
+                document_data = extract_document(source, reporter)
+            collected_data["text_content"].extend(document_data.get("text_content", []))
+            collected_data["images"].extend(document_data.get("images", []))
+
+            # 파일명 출처로 추가
+            document_name = params.get('document_name') or source.name
+            collected_data["sources"].append(f"업로드 문서: {document_name}")
+
+            # 코퍼스에 저장하면 다음 보고서부터는 파일을 다시 읽지 않고 색인에서 검색
+            if params.get("add_to_corpus") and document_data.get("text_content"):
+                _document_id, added = get_corpus().add_document(
+                    document_name, source.sha256(), document_data["text_content"])
+                reporter.info(f"코퍼스 {'저장' if added else '이미 저장된 문서'}: {document_name}")
+        except Exception as e:
+            reporter.error(f"문서 분석 중 오류 발생: {str(e)}")
+
+    # 1-C: 코퍼스에서 질의 관련 청크 검색 (선택)
+    if corpus_top_k and user_query:
+        try:
+            with reporter.stage("corpus_search", "코퍼스 검색 중..."):
+                hits = get_corpus().search(user_query, corpus_top_k, params.get("corpus_documents"))
+            collected_data["text_content"].extend(hit["text"] for hit in hits)
+            for name in dict.fromkeys(hit["document"] for hit in hits):
+                collected_data["sources"].append(f"코퍼스 문서: {name}")
+            reporter.info(f"코퍼스 검색: 관련 청크 {len(hits)}개")
+        except Exception as e:
+            reporter.error(f"코퍼스 검색 중 오류 발생: {str(e)}")
+
+    return collected_data
+
+
+def prepare_context(user_query, collected_data, client, temperature=0.3, context_budget=None,
+                    hierarchical=False, reporter=None):
+    """보고서 프롬프트에 넣을 컨텍스트 구성 (예산 안으로 청크 패킹, 긴 문서는 청크별 요약)"""
+    reporter = reporter or Reporter()
+
+    # 긴 문서: 예산을 넘으면 청크별 요약(map/collapse)을 컨텍스트로 사용
+    if hierarchical:
+        total_tokens = sum(count_tokens(text) for text in collected_data["text_content"])
+        if total_tokens > (context_budget or CONTEXT_TOKEN_BUDGET):
+            with reporter.trace.span("map_reduce"):
+                summaries, stats = summarize_context(
+                    user_query, collected_data["text_content"], chat_llm(client, REPORT_MODEL),
+                    temperature=temperature, reduce_budget=context_budget
+                )
+            stage_summary = ", ".join(
+                f"{name} {stage['calls']}회 {stage['seconds']:.1f}초 "
+                f"({stage['prompt_tokens']}+{stage['completion_tokens']} 토큰)"
+                for name, stage in stats["stages"].items()
+            )
+            reporter.info(f"계층 요약: 청크 {stats['chunks']}개 → 요약 {stats['summaries']}개 | {stage_summary}")
+            return summaries
+
+    # 질의 관련도 순으로 토큰 예산 안에 청크를 채움 (근접 중복 제외)
+    with reporter.trace.span("context_pack"):
+        packed = pack_context(user_query, collected_data["text_content"], token_budget=context_budget)
+    packing = packed["stats"]
+    reporter.info(
+        f"컨텍스트 패킹: {packing['packed_chunks']}/{packing['total_chunks']}개 청크, "
+        f"{packing['packed_tokens']} 토큰 사용, {packing['dropped_tokens']} 토큰 제외 "
+        f"(중복 {packing['duplicate_chunks']}개)"
+    )
+    return packed["chunks"]
+
+
+def write_report(user_query, context_chunks, sources, client, report_options, temperature=0.3,
+                 on_text=None, reporter=None):
+    """구성된 컨텍스트로 보고서 작성 (LLM 호출 1회, on_text가 있으면 스트리밍)"""
+    reporter = reporter or Reporter()
+    messages = build_report_messages(build_report_prompt(user_query, context_chunks, sources, **report_options))
+
+    with reporter.trace.span("llm"):
+        # 스트리밍 모드: 받은 토큰을 바로 전달하고 첫 토큰 시간(TTFT) 측정
+        if on_text is not None:
+            stream_timings = {}
+            report = streaming_llm(client, REPORT_MODEL, on_text=on_text, timings=stream_timings)(
+                messages, temperature, REPORT_MAX_TOKENS)
+            report_stream_timings(stream_timings, reporter)
+            return report
+
+        return chat(client, REPORT_MODEL, messages, temperature, REPORT_MAX_TOKENS)
+
+
+def generate_report(user_query, collected_data, api_key, style="기사형", include_title=True,
+                    include_lead=True, include_body=True, include_sources=True,
+                    report_length=2, temperature=0.3, context_budget=None, hierarchical=False,
+                    on_text=None, reporter=None):
+    """GPT를 이용한 보고서 생성 (on_text가 있으면 생성 중인 누적 내용을 스트리밍으로 전달)"""
+    reporter = reporter or Reporter()
+
+    report_options = {
+        "style": style,
+        "include_title": include_title,
+        "include_lead": include_lead,
+        "include_body": include_body,
+        "include_sources": include_sources,
+        "report_length": report_length
+    }
+
+    # OpenAI API 호출 (1.0.0 이상 버전 방식)
+    try:
+        # 공용 클라이언트 (연결 재사용, 타임아웃, 429/5xx 재시도, temperature 0 응답 캐시)
+        client = get_client(api_key)
+        context_chunks = prepare_context(user_query, collected_data, client, temperature,
+                                         context_budget, hierarchical, reporter)
+        return write_report(user_query, context_chunks, collected_data["sources"], client,
+                            report_options, temperature, on_text, reporter)
+    except Exception as e:
+        error_msg = f"GPT API 오류: {str(e)}"
+        reporter.error(error_msg)
+        print(error_msg)
+        return f"보고서 생성 중 오류가 발생했습니다: {str(e)}"
+
+
+def report_stream_timings(timings, reporter):
+    """스트리밍 응답의 첫 토큰 시간과 전체 시간 전달"""
+    if timings.get("cached"):
+        reporter.info("동일한 요청의 캐시된 응답을 사용했습니다.")
+    elif timings.get("ttft") is not None:
+        message = f"첫 토큰까지 {timings['ttft']:.2f}초, 전체 생성 {timings['seconds']:.2f}초"
+        reporter.info(message)
+        print(message)
+
+
+def format_report_with_links(report_content, sources):
+    """보고서 내용에 참고 링크가 없는 경우 추가"""
+    if '참고 링크:' not in report_content and sources:
+        report_content += "\n\n## 참고 링크:\n"
+        for source in sources:
+            report_content += f"- [{source}]({source})\n"
+
+    return report_content
+
+
+def run_report_job(params, reporter=None):
+    """수집 → 문서 추출 → 보고서 생성 전체 실행 (params는 JSON 직렬화 가능한 옵션, 실패 시 report는 None)"""
+    reporter = reporter or Reporter()
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    user_query = params.get("user_query", "")
+    document_path = params.get("document_path")
+    include_images = params.get("include_images", True)
+    temperature = params.get("temperature", 0.3)
+
+    # 초안은 선택한 항목만 작성하고, 항목을 빼기만 한 재생성은 이전 초안을 나눠 재사용
+    draft_options = {
+        "style": params.get("style", "기사형"),
+        "report_length": params.get("report_length", 2)
+    }
+    sections = {name: params.get(name, True)
+                for name in ("include_title", "include_lead", "include_body", "include_sources")}
+
+    # 업로드 문서는 이 블록 안에서만 열어두고 종료 시 닫음
+    with ExitStack() as document_stack:
+        # 1. 데이터 수집 단계
+        reporter.progress(0.0, "1/3 단계: 데이터 수집 중...")
+        result = {"report": None, "sources": [], "images": []}
+
+        source = None
+        if document_path:
+            try:
+                # PDF 이미지는 지연 참조이므로 이미지 준비가 끝날 때까지 문서를 열어둠
+                source = document_stack.enter_context(open_document(document_path))
+            except Exception as e:
+                reporter.error(f"문서 분석 중 오류 발생: {str(e)}")
+
+        # 같은 세션에서 출력 옵션만 바꾼 재생성은 이전 단계 결과를 재사용
+        # (수집: 질의+문서, 컨텍스트: +예산/계층 요약, 초안: +스타일/길이/temperature/모델)
+        collect_key = context_key = draft_key = None
+        session_id = params.get("session_id")
+        if session_id:
+            collect_key = stage_key("collect", session_id, collection_inputs(params, source))
+            context_key = stage_key("context", collect_key, params.get("context_budget"),
+                                    params.get("hierarchical", False))
+            draft_key = stage_key("draft", context_key, draft_options, temperature, REPORT_MODEL)
+        collected = stage_cache.get(collect_key) if collect_key else None
+        context_chunks = stage_cache.get(context_key) if collected is not None else None
+        draft = stage_cache.get(draft_key) if context_chunks is not None else None
+        report_content = select_report_sections(draft["text"], draft["sections"], sections) if draft else None
+        if draft and report_content is None:
+            reporter.info("이전 보고서 초안에서 선택한 항목을 나눌 수 없어 다시 작성합니다.")
+
+        # 실행할 단계와 예상 비중 (단계가 끝날 때마다 완료된 비중만큼 진행률 갱신)
+        stage_weights = {}
+        if collected is None:
+            if user_query:
+                stage_weights["web_research"] = 3
+            if source is not None:
+                stage_weights["document_extract"] = 3
+            if params.get("corpus_top_k") and user_query:
+                stage_weights["corpus_search"] = 1
+        if report_content is None:
+            stage_weights["report_generate"] = 5
+        if include_images and (collected is None or collected["prepared_images"] is None):
+            stage_weights["image_prepare"] = 1
+        reporter.trace.plan(stage_weights)
+
+        if collected is None:
+            errors = sum(1 for level, _ in reporter.messages if level == "error")
+            collected_data = collect_data(params, source, reporter)
+            collected = {
+                "text_content": collected_data["text_content"],
+                "sources": collected_data["sources"],
+                # 문서 이미지는 레코드로 보관했다가 다음 실행에서 새로 연 문서에 다시 연결
+                "images": [image_to_record(img, caption) for img, caption in collected_data["images"]],
+                "prepared_images": None
+            }
+            # 일부 수집이 실패한 결과는 재사용하지 않음 (다시 실행하면 재시도)
+            if collect_key and collected["text_content"] and \
+                    sum(1 for level, _ in reporter.messages if level == "error") == errors:
+                stage_cache.set(collect_key, collected)
+        else:
+            metrics.record(cache_hits=1)
+            reporter.info("이전 수집 결과 재사용: 검색/문서 추출 생략")
+            collected_data = {
+                "text_content": collected["text_content"],
+                "sources": collected["sources"],
+                "images": [image_from_record(source, record) for record in collected["images"]]
+            }
+
+        # 2. 보고서 생성 단계
+        if collected_data["text_content"]:
+            try:
+                if report_content is None:
+                    with reporter.stage("report_generate", "2/3 단계: 보고서 생성 중..."):
+                        client = get_client(openai_api_key)
+                        if context_chunks is None:
+                            context_chunks = prepare_context(user_query, collected_data, client, temperature,
+                                                             params.get("context_budget"),
+                                                             params.get("hierarchical", False), reporter)
+                            if context_key:
+                                stage_cache.set(context_key, context_chunks)
+                        else:
+                            reporter.info("이전 컨텍스트 재사용: 패킹/요약 생략")
+
+                        draft_text = write_report(user_query, context_chunks, collected_data["sources"], client,
+                                                  dict(draft_options, **sections), temperature,
+                                                  on_text=reporter.partial if params.get("stream") else None,
+                                                  reporter=reporter)
+                    report_content = draft_text.strip()
+                    if draft_key:
+                        stage_cache.set(draft_key, {"sections": sections, "text": draft_text})
+                else:
+                    metrics.record(cache_hits=1)
+                    reporter.info("이전 보고서 초안 재사용: 선택한 항목만 다시 구성")
+
+                # 참고 링크를 포함할 때만 링크 목록 형식 확인 및 추가
+                if sections["include_sources"]:
+                    report_content = format_report_with_links(report_content, collected_data["sources"])
+                result["report"] = report_content
+                result["sources"] = collected_data["sources"]
+
+                # 이미지 처리 (include_images가 True인 경우)
+                if include_images and collected_data["images"]:
+                    if collected["prepared_images"] is None:
+                        # 최대 3개만 사용, 후보를 동시에 가져와 검증/축소한 바이트를 미리보기와 DOCX에 공통 사용
+                        with reporter.stage("image_prepare", "이미지 준비 중..."):
+                            prepared = prepare_images(collected_data["images"], limit=3)
+                        # 이미지 바이트는 산출물 저장소에 두고 단계 캐시와 결과에는 핸들만 보관
+                        collected["prepared_images"] = [image_to_record(img, caption) for img, caption in prepared]
+                    result["images"] = [image_from_record(None, record) for record in collected["prepared_images"]]
+            except Exception as e:
+                reporter.error(f"보고서 생성 중 오류 발생: {str(e)}")
+
+        # 3. 결과 완료
+        reporter.progress(1.0, "3/3 단계: 결과 정리 중...")
+        return result
+
+
+def report_job(params, reporter):
+    """작업 큐용 run_report_job (결과 이미지를 JSON 레코드로 변환)"""
+    result = run_report_job(params, reporter)
+    result["images"] = [image_to_record(img, caption) for img, caption in result["images"]]
+    return result
+
+
+def corpus_job(params, reporter):
+    """작업 큐용 코퍼스 문서 추가 (추출 캐시를 거쳐 청크 색인)"""
+    with open_document(params["document_path"]) as source:
+        document_name = params.get("document_name") or source.name
+        reporter.trace.plan({"document_extract": 4, "corpus_index": 1})
+        with reporter.stage("document_extract", f"문서 분석 중: {document_name}"):
+            document_data = extract_document(source, reporter)
+        if not document_data["text_content"]:
+            raise ValueError(f"텍스트를 추출하지 못했습니다: {document_name}")
+
+        with reporter.stage("corpus_index", "코퍼스 색인 중..."):
+            document_id, added = get_corpus().add_document(
+                document_name, source.sha256(), document_data["text_content"])
+    return {"document_id": document_id, "added": added, "name": document_name}
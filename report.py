@@ -0,0 +1,137 @@
+import re
+
+# ----- 보고서 프롬프트 구성 -----
+
+REPORT_MODEL = "gpt-4"  # 또는 다른 모델
+REPORT_MAX_TOKENS = 3000
+SYSTEM_PROMPT = "당신은 전문 기자이자 리서치 애널리스트입니다."
+
+# 분량 설정
+LENGTH_MAP = {
+    1: "매우 간결하게 (300단어 이내)",
+    2: "간결하게 (500단어 이내)",
+    3: "보통 분량 (800단어 이내)",
+    4: "상세하게 (1200단어 이내)",
+    5: "매우 상세하게 (2000단어 이내)"
+}
+
+# 항목별로 나눠 다시 조립할 수 있도록 지정하는 출력 형식
+SECTION_FORMAT = (
+    "출력 형식: 제목은 '# '로 시작하는 한 줄, 리드 문단은 제목 바로 아래 한 단락, "
+    "본문은 '## ' 소제목으로 구분, 참고 링크는 '## 참고 링크:' 제목 아래 목록으로 작성하세요."
+)
+
+# 참고 링크 항목 제목 (마크다운 제목/굵게 표시 허용)
+SOURCES_HEADING_PATTERN = re.compile(r"^\s*(#{1,6}\s*)?(\*\*)?참고 링크\s*:?\s*(\*\*)?\s*:?\s*$")
+
+
+def build_report_prompt(user_query, context_chunks, sources, style="기사형", include_title=True,
+                        include_lead=True, include_body=True, include_sources=True, report_length=2):
+    """보고서 생성 프롬프트 구성 (수집 정보는 이미 선별/요약된 청크 목록)"""
+    prompt = "다음 정보를 기반으로 "
+
+    if style == "기사형":
+        prompt += "경제/기술 기사처럼 작성해주세요. 문장은 간결하고, 정보 중심적으로 구성하며, 독자가 빠르게 요점을 이해할 수 있도록 구성해주세요."
+    else:
+        prompt += f"다음 스타일로 작성해주세요: {style}"
+
+    # 포함할 항목 지정
+    report_sections = []
+    if include_title:
+        report_sections.append("제목 (강력한 메시지를 담은 헤드라인)")
+    if include_lead:
+        report_sections.append("리드 문단 (핵심 요약 또는 임팩트 있는 문장)")
+    if include_body:
+        report_sections.append("주요 본문 (단락으로 구분된 상세 내용)")
+    if include_sources:
+        report_sections.append("참고 링크 목록")
+
+    prompt += f"\n\n포함할 항목: {', '.join(report_sections)}"
+    prompt += f"\n{SECTION_FORMAT}"
+
+    prompt += f"\n\n분량: {LENGTH_MAP[report_length]}"
+
+    # 검색 질의 및 수집 데이터 추가
+    prompt += f"\n\n사용자 질의: {user_query}\n\n"
+    prompt += "수집된 정보:\n"
+
+    for i, text in enumerate(context_chunks):
+        prompt += f"{i+1}. {text}\n"
+
+    if sources:
+        prompt += "\n참고 링크:\n"
+        for source in sources:
+            prompt += f"- {source}\n"
+
+    # 링크 목록 형식을 명확히 지정
+    if include_sources and sources:
+        prompt += "\n마지막에 반드시 '참고 링크:' 제목 아래에 수집된 출처 링크를 목록 형태로 포함시켜주세요. 각 링크는 새 줄에 표시하고 하이퍼링크 형식으로 작성하세요."
+
+    return prompt
+
+
+def split_report_sections(report):
+    """생성된 보고서를 제목/리드/본문/참고 링크 항목으로 분리"""
+    sections = {"title": "", "lead": "", "body": "", "sources": ""}
+    lines = report.strip().split("\n")
+
+    # 참고 링크는 제목 줄부터 끝까지
+    for index, line in enumerate(lines):
+        if SOURCES_HEADING_PATTERN.match(line):
+            sections["sources"] = "\n".join(lines[index:]).strip()
+            lines = lines[:index]
+            break
+
+    if lines and lines[0].startswith("# "):
+        sections["title"] = lines[0].strip()
+        lines = lines[1:]
+
+    # 리드는 첫 소제목 전까지 (소제목이 없으면 첫 단락)
+    rest = "\n".join(lines).strip()
+    heading = re.search(r"^## ", rest, re.MULTILINE)
+    if heading:
+        sections["lead"] = rest[:heading.start()].strip()
+        sections["body"] = rest[heading.start():].strip()
+    else:
+        lead, _, body = rest.partition("\n\n")
+        sections["lead"] = lead.strip()
+        sections["body"] = body.strip()
+    return sections
+
+
+def assemble_report(sections, include_title=True, include_lead=True, include_body=True, include_sources=True):
+    """선택한 항목만 순서대로 이어 보고서 구성"""
+    included = {"title": include_title, "lead": include_lead, "body": include_body, "sources": include_sources}
+    return "\n\n".join(sections[name] for name in ("title", "lead", "body", "sources")
+                        if included[name] and sections[name])
+
+
+def select_report_sections(report, drafted, selected):
+    """drafted 항목 옵션으로 작성한 보고서에서 selected 항목만 남김 (항목을 나눌 수 없으면 None)"""
+    if selected == drafted:
+        return report.strip()
+    if any(selected[name] and not drafted[name] for name in selected):
+        return None
+
+    sections = split_report_sections(report)
+    # 리드 없이 작성했으면 첫 소제목 앞 단락도 본문
+    if not drafted["include_lead"]:
+        sections["body"] = "\n\n".join(part for part in (sections["lead"], sections["body"]) if part)
+        sections["lead"] = ""
+
+    # 모델이 SECTION_FORMAT과 다르게 작성하면 빼려는 항목이 남거나 본문이 함께 빠지므로 나누지 않음
+    missing = (
+        (drafted["include_title"] and not sections["title"])
+        or (drafted["include_lead"] and not sections["lead"])
+        or (drafted["include_lead"] and drafted["include_body"] and not sections["body"].startswith("## "))
+        or (drafted["include_sources"] and not selected["include_sources"] and not sections["sources"])
+    )
+    return None if missing else assemble_report(sections, **selected)
+
+
+def build_report_messages(prompt):
+    """채팅 API 메시지 목록"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
@@ -0,0 +1,145 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import firecrawl
+from firecrawl import normalize_domains, normalize_query
+import metrics
+
+# ----- 다중 질의 심층 리서치 설정 -----
+
+# 동시에 실행할 Firecrawl 요청 수
+RESEARCH_MAX_WORKERS = int(os.getenv("RESEARCH_MAX_WORKERS", "4"))
+
+# 본문 수집 시 페이지당 최대 글자 수 (프롬프트 과다 방지)
+SCRAPE_MAX_CHARS = int(os.getenv("SCRAPE_MAX_CHARS", "4000"))
+
+# 하위 질의 생성용 관점 (원 질의에 덧붙여 검색 범위를 넓힘)
+QUERY_ASPECTS = ["최신 동향", "시장 규모 통계", "전망", "주요 기업 사례", "문제점과 과제"]
+
+
+def expand_query(query, domains=None, max_queries=4):
+    """사용자 질의를 여러 하위 질의로 확장 (원 질의 + 도메인 한정 + 관점별)"""
+    query = " ".join(query.split())
+    queries = [query]
+
+    # 참조 도메인이 있으면 도메인별 site: 질의를 우선 배치
+    for domain in normalize_domains(domains):
+        queries.append(f"{query} site:{domain}")
+
+    for aspect in QUERY_ASPECTS:
+        queries.append(f"{query} {aspect}")
+
+    # 정규화 기준 중복 제거 후 개수 제한
+    unique = []
+    seen = set()
+    for q in queries:
+        key = normalize_query(q)
+        if key not in seen:
+            seen.add(key)
+            unique.append(q)
+    return unique[:max(1, max_queries)]
+
+
+def _item_url(item):
+    return item.get("link") or item.get("url")
+
+
+def _run_search(query, api_key, domains):
+    """하위 질의 검색 1건 (소요 시간 포함, 실패는 결과에 기록)"""
+    started = time.perf_counter()
+    try:
+        result_data, from_cache = firecrawl.search(query, api_key, domains)
+        _formatted, items = firecrawl.format_search_results(result_data)
+        return {"query": query, "items": items, "cached": from_cache,
+                "error": None, "seconds": time.perf_counter() - started}
+    except Exception as e:
+        return {"query": query, "items": [], "cached": False,
+                "error": str(e), "seconds": time.perf_counter() - started}
+
+
+def _run_scrape(url, api_key):
+    """상위 결과 본문 수집 1건 (실패 시 빈 문자열)"""
+    try:
+        return url, firecrawl.scrape(url, api_key)[:SCRAPE_MAX_CHARS], None
+    except Exception as e:
+        return url, "", str(e)
+
+
+def fan_out_research(query, api_key, domains=None, max_queries=4, scrape_top=0, max_workers=None):
+    """하위 질의를 동시에 검색하고 결과를 병합/중복 제거하여 text_content/sources/images로 반환"""
+    if max_workers is None:
+        max_workers = RESEARCH_MAX_WORKERS
+
+    started = time.perf_counter()
+    queries = expand_query(query, domains, max_queries)
+
+    result = {
+        "text_content": [],
+        "images": [],
+        "sources": [],
+        "queries": [],
+        "errors": []
+    }
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # 1. 하위 질의 동시 검색 (전체 소요 시간 ≈ 가장 느린 요청)
+        # 요청 바이트/캐시 적중이 호출한 단계의 span에 기록되도록 컨텍스트를 이어서 실행
+        searches = list(executor.map(metrics.bind(lambda q: _run_search(q, api_key, domains)), queries))
+
+        # 2. URL 기준 병합/중복 제거 (질의 순서 → 결과 순위 순)
+        merged = []
+        seen_urls = set()
+        seen_texts = set()
+        for search in searches:
+            result["queries"].append({
+                "query": search["query"],
+                "results": len(search["items"]),
+                "cached": search["cached"],
+                "seconds": round(search["seconds"], 3)
+            })
+            if search["error"]:
+                result["errors"].append(f"{search['query']}: {search['error']}")
+
+            for item in search["items"]:
+                url = _item_url(item)
+                if url and url in seen_urls:
+                    continue
+                if url:
+                    seen_urls.add(url)
+                merged.append(item)
+
+        # 3. 상위 결과 본문 수집 (선택)
+        scraped = {}
+        scrape_urls = [_item_url(item) for item in merged if _item_url(item)][:scrape_top]
+        for url, content, error in executor.map(metrics.bind(lambda u: _run_scrape(u, api_key)), scrape_urls):
+            if error:
+                result["errors"].append(f"{url}: {error}")
+            elif content.strip():
+                scraped[url] = content
+
+    # 4. text_content/sources/images 구조로 변환
+    for item in merged:
+        url = _item_url(item)
+        texts = []
+        if url in scraped:
+            texts.append(scraped[url])
+        elif "snippet" in item:
+            texts.append(item["snippet"])
+        if "title" in item:
+            texts.append(f"제목: {item['title']}")
+
+        for text in texts:
+            if text not in seen_texts:
+                seen_texts.add(text)
+                result["text_content"].append(text)
+
+        if url:
+            result["sources"].append(url)
+
+        if "image" in item:
+            result["images"].append((item["image"], item.get("title", "이미지")))
+        elif "image_url" in item and "title" in item:
+            result["images"].append((item["image_url"], item["title"]))
+
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
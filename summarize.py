@@ -0,0 +1,160 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from context import split_chunks, count_tokens, CONTEXT_TOKEN_BUDGET
+import metrics
+
+# ----- 긴 문서 계층 요약(map-reduce) 설정 -----
+
+# map 단계에서 한 번에 요약할 청크 크기 (토큰)
+MAP_CHUNK_TOKENS = int(os.getenv("MAP_CHUNK_TOKENS", "2500"))
+
+# 청크 요약 1건의 최대 응답 토큰
+MAP_SUMMARY_TOKENS = int(os.getenv("MAP_SUMMARY_TOKENS", "400"))
+
+# 동시에 실행할 요약 요청 수
+SUMMARY_MAX_WORKERS = int(os.getenv("SUMMARY_MAX_WORKERS", "4"))
+
+# 요약이 reduce 예산을 넘을 때 다시 묶어 요약하는 최대 횟수
+MAX_COLLAPSE_ROUNDS = 3
+
+MAP_SYSTEM_PROMPT = "당신은 문서의 핵심 사실을 빠짐없이 정확하게 요약하는 리서치 애널리스트입니다."
+
+
+def build_map_prompt(user_query, text):
+    """청크 요약 프롬프트"""
+    focus = f"'{user_query}'와 관련된 " if user_query else ""
+    return (
+        f"다음은 긴 문서의 일부입니다. {focus}핵심 사실, 수치, 고유명사를 중심으로 "
+        f"간결한 글머리표로 요약해주세요. 관련 내용이 없으면 '관련 내용 없음'이라고만 답하세요.\n\n{text}"
+    )
+
+
+def build_collapse_prompt(user_query, summaries):
+    """부분 요약들을 다시 하나로 합치는 프롬프트"""
+    focus = f"'{user_query}'에 대한 " if user_query else ""
+    joined = "\n\n".join(f"[부분 요약 {i+1}]\n{summary}" for i, summary in enumerate(summaries))
+    return (
+        f"다음 부분 요약들을 {focus}하나의 요약으로 합쳐주세요. 중복은 제거하고 "
+        f"수치와 고유명사는 유지하세요.\n\n{joined}"
+    )
+
+
+def make_stub_llm(latency=0.0):
+    """로컬 테스트용 LLM: 사용자 메시지 앞부분을 max_tokens 근사치만큼 돌려줌"""
+    def call(messages, temperature, max_tokens):
+        if latency:
+            time.sleep(latency)
+        words = messages[-1]["content"].split()
+        output = []
+        for word in words:
+            if count_tokens(" ".join(output + [word])) > max_tokens:
+                break
+            output.append(word)
+        return " ".join(output)
+    return call
+
+
+class StageRecorder:
+    """단계별 호출 수, 소요 시간, 토큰 수 기록 (스레드 안전)"""
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, name):
+        return self.stages.setdefault(name, {
+            "calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0
+        })
+
+    def call(self, name, llm, messages, temperature, max_tokens):
+        """LLM 호출 후 토큰 수 기록"""
+        output = llm(messages, temperature, max_tokens) or ""
+        prompt_tokens = sum(count_tokens(m["content"]) for m in messages)
+        with self._lock:
+            stage = self._stage(name)
+            stage["calls"] += 1
+            stage["prompt_tokens"] += prompt_tokens
+            stage["completion_tokens"] += count_tokens(output)
+        return output
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self._stage(name)["seconds"] += round(seconds, 3)
+
+
+def _summarize_all(recorder, stage, llm, prompts, temperature, max_workers):
+    """프롬프트 목록을 제한된 워커 풀로 동시에 요약 (입력 순서 유지)"""
+    started = time.perf_counter()
+
+    def run(prompt):
+        messages = [
+            {"role": "system", "content": MAP_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        return recorder.call(stage, llm, messages, temperature, MAP_SUMMARY_TOKENS)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        outputs = list(executor.map(metrics.bind(run), prompts))
+
+    recorder.add_time(stage, time.perf_counter() - started)
+    return [output.strip() for output in outputs if output.strip() and output.strip() != "관련 내용 없음"]
+
+
+def _group_by_tokens(texts, max_tokens):
+    """요약 목록을 토큰 한도 내의 묶음으로 나눔"""
+    groups = []
+    current = []
+    current_tokens = 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def summarize_context(user_query, texts, llm, temperature=0.3, map_chunk_tokens=None,
+                      reduce_budget=None, max_workers=None, recorder=None):
+    """긴 문서를 청크별로 동시에 요약(map)하고 예산을 넘으면 다시 묶어 요약(collapse)한 목록 반환"""
+    if map_chunk_tokens is None:
+        map_chunk_tokens = MAP_CHUNK_TOKENS
+    if reduce_budget is None:
+        reduce_budget = CONTEXT_TOKEN_BUDGET
+    if max_workers is None:
+        max_workers = SUMMARY_MAX_WORKERS
+    recorder = recorder or StageRecorder()
+
+    # 1. map: 청크별 요약
+    chunks = split_chunks(texts, map_chunk_tokens)
+    summaries = _summarize_all(
+        recorder, "map", llm,
+        [build_map_prompt(user_query, chunk["text"]) for chunk in chunks],
+        temperature, max_workers
+    )
+
+    # 2. collapse: 요약 합계가 reduce 예산을 넘으면 묶어서 다시 요약
+    for _ in range(MAX_COLLAPSE_ROUNDS):
+        if len(summaries) <= 1 or sum(count_tokens(s) for s in summaries) <= reduce_budget:
+            break
+        groups = _group_by_tokens(summaries, map_chunk_tokens)
+        if len(groups) >= len(summaries):
+            break
+        summaries = _summarize_all(
+            recorder, "collapse", llm,
+            [build_collapse_prompt(user_query, group) for group in groups],
+            temperature, max_workers
+        )
+
+    stats = {
+        "chunks": len(chunks),
+        "summaries": len(summaries),
+        "stages": recorder.stages
+    }
+    return summaries, stats
+